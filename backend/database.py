@@ -1,29 +1,108 @@
 import logging
-from typing import Generator, Optional
+from typing import AsyncGenerator, Optional
 import os
 
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 logger = logging.getLogger(__name__)
 
 # Get database URL from environment
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Connection pool sizing: pool_size should cover workers * concurrent requests per worker
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+# The async engine only serves light checks (e.g. /health/detailed), so it gets its
+# own small pool instead of doubling each worker's share of Postgres max_connections
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "2"))
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "0"))
 engine = None
+async_engine = None
+
+def _to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL to the matching asyncio driver URL"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
 
 if DATABASE_URL:
     # Create SQLModel engine if DATABASE_URL is provided
     engine = create_engine(
         DATABASE_URL,
-        echo=False  # Set to True for SQL query logging
+        echo=False,  # Set to True for SQL query logging
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,  # Drop connections before server-side idle timeouts
+        pool_pre_ping=True  # Transparently replace connections broken by DB restarts
+    )
+    # Async engine for handlers that must not block the event loop on DB I/O
+    async_engine = create_async_engine(
+        _to_async_url(DATABASE_URL),
+        echo=False,
+        pool_size=DB_ASYNC_POOL_SIZE,
+        max_overflow=DB_ASYNC_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True
     )
     logger.info("Database engine initialized")
 else:
     logger.warning("DATABASE_URL not set. Database features will be disabled")
 
-def get_session() -> Generator[Session, None, None]:
+class LazySession:
+    """
+    Session proxy that creates the real Session on first use.
+
+    Handlers that depend on get_session but return before touching the
+    database (e.g. cached bank responses) never build a Session at all.
+    Attribute access is forwarded to the underlying Session.
+    """
+
+    __slots__ = ("_engine", "_session")
+
+    def __init__(self, bind) -> None:
+        self._engine = bind
+        self._session: Optional[Session] = None
+
+    def _get(self) -> Session:
+        if self._session is None:
+            self._session = Session(self._engine)
+        return self._session
+
+    @property
+    def started(self) -> bool:
+        """Whether the underlying Session has been created"""
+        return self._session is not None
+
+    def __getattr__(self, name: str):
+        return getattr(self._get(), name)
+
+    def __enter__(self) -> "LazySession":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+async def get_session() -> AsyncGenerator[Session, None]:
     """
     FastAPI dependency that provides a SQLModel database session.
+    The Session is created lazily, so endpoints that never query pay nothing.
+    The dependency itself is async, so FastAPI does not hop to the threadpool
+    to set it up; only closing a Session that was used runs there.
     If DATABASE_URL is not set, raises HTTPException.
     
     Usage:
@@ -41,5 +120,33 @@ def get_session() -> Generator[Session, None, None]:
             detail="Database connection not configured"
         )
         
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+    session = LazySession(engine)
+    try:
+        yield session
+    finally:
+        if session.started:
+            # Closing returns the connection (with a rollback) - blocking I/O
+            await run_in_threadpool(session.close)
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency that provides an async SQLModel session.
+    Queries are awaited, so DB I/O yields to the event loop instead of blocking it.
+    If DATABASE_URL is not set, raises HTTPException.
+    
+    Usage:
+        ```python
+        @app.get("/items")
+        async def list_items(session: AsyncSession = Depends(get_async_session)):
+            items = (await session.exec(select(Item))).all()
+            return items
+        ```
+    """
+    if not async_engine:
+        raise HTTPException(
+            status_code=503,
+            detail="Database connection not configured"
+        )
+    
+    async with AsyncSession(async_engine) as session:
+        yield session
@@ -1,15 +1,22 @@
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Query
 from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import SQLModel, Session, select
+from sqlalchemy import text, func
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
 import os
 
-from database import engine, get_session
+from database import engine, async_engine, get_async_session
+from responses import ORJSONResponse
+from services.cache import close_cache, start_invalidation_listener
+from services.http_client import close_http_client, get_http_client
 from routes import receipts, auth, tax_payments, accounts
 from models.receipt import Receipt
 from models.consent import Consent
@@ -30,11 +37,18 @@ CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 BASE_URL = os.getenv("BASE_URL", "https://sbank.open.bankingapi.ru")
 JWT_SECRET = os.getenv("JWT_SECRET")
+HEALTH_CACHE_TTL_SECONDS = float(os.getenv("HEALTH_CACHE_TTL_SECONDS", "3"))
+# Recreate tables on startup (dev only); production schema is managed separately
+RUN_DDL = os.getenv("RUN_DDL", "0") == "1"
+
+# Short-lived cache for /health/detailed so concurrent probes share one DB round trip
+_health_cache = {"ts": 0.0, "payload": None}
+_health_lock = asyncio.Lock()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle events for the FastAPI application"""
-    if engine:
+    if engine and RUN_DDL:
         # Drop all existing tables and recreate them to ensure schema is up to date
         SQLModel.metadata.drop_all(engine)
         logger.info("Dropped all existing tables")
@@ -42,16 +56,23 @@ async def lifespan(app: FastAPI):
         SQLModel.metadata.create_all(engine)
         logger.info("Database tables created")
     
+    start_invalidation_listener()
+    # Create the shared bank HTTP client up front instead of on the first request
+    get_http_client()
+    
     yield
     
-    if engine:
-        pass
+    await close_http_client()
+    await close_cache()
+    if async_engine:
+        await async_engine.dispose()
 
 app = FastAPI(
     title="Syntax Multi-Banking API",
     description="Multi-bank transaction aggregation for self-employed",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware to allow frontend requests
@@ -59,8 +80,10 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://localhost:3000", "http://127.0.0.1:5173"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists (headers the API reads) let browsers cache preflights via max_age
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type", "consent_id", "client_id", "accountId", "X-Bank-Name"],
+    max_age=86400,
 )
 
 # Root redirect
@@ -82,31 +105,59 @@ async def health_check():
     return {"status": "ok"}
 
 @app.get("/health/detailed")
-async def detailed_health_check(session: Session = Depends(get_session)):
+async def detailed_health_check(
+    verbose: bool = Query(False, description="Include receipts count (runs COUNT query)"),
+    session: AsyncSession = Depends(get_async_session)
+):
     """Detailed health check with database status"""
+    if not verbose:
+        payload = _health_cache["payload"]
+        if payload is not None and time.monotonic() - _health_cache["ts"] < HEALTH_CACHE_TTL_SECONDS:
+            return payload
+        
+        async with _health_lock:
+            # Another probe may have refreshed the cache while we were waiting
+            payload = _health_cache["payload"]
+            if payload is not None and time.monotonic() - _health_cache["ts"] < HEALTH_CACHE_TTL_SECONDS:
+                return payload
+            
+            payload = await _build_health_payload(session, verbose=False)
+            _health_cache["ts"] = time.monotonic()
+            _health_cache["payload"] = payload
+            return payload
+    
+    return await _build_health_payload(session, verbose=True)
+
+async def _build_health_payload(session: AsyncSession, verbose: bool) -> dict:
+    """Run the database checks and build the health response body"""
     db_status = "ok"
-    receipts_count = 0
     error_message = None
+    receipts_count = None
     
     try:
-        result = session.exec(select(Receipt)).all()
-        receipts_count = len(result)
+        # Liveness probe: single round trip, no rows materialized
+        (await session.exec(text("SELECT 1"))).first()
+        if verbose:
+            receipts_count = (await session.exec(select(func.count()).select_from(Receipt))).one()
     except Exception as e:
         db_status = "error"
         error_message = str(e)
         logger.error(f"Database health check failed: {error_message}")
     
-    return {
+    response = {
         "backend": "ok",
         "database": db_status,
         "database_error": error_message,
-        "receipts_count": receipts_count,
         "timestamp": datetime.utcnow().isoformat(),
         "services": {
             "accounts": "available",
             "receipts": "available"
         }
     }
+    if verbose:
+        response["receipts_count"] = receipts_count
+    
+    return response
 
 # Error handler
 @app.exception_handler(Exception)
@@ -2,7 +2,8 @@ from datetime import datetime
 from typing import Optional
 from uuid import UUID, uuid4
 
-from sqlmodel import SQLModel, Field
+from sqlalchemy import func
+from sqlmodel import SQLModel, Field, Index
 
 
 class Consent(SQLModel, table=True):
@@ -20,6 +21,11 @@ class Consent(SQLModel, table=True):
     - ABank: pending → authorized (auto-approved)
     - SBank/VBank: pending → awaitingAuthorization → authorized (manual approval)
     """
+    # Active consent lookups filter by client, bank and status together
+    __table_args__ = (
+        Index("ix_consent_client_bank_status", "client_id", "bank_name", "status"),
+    )
+    
     id: UUID = Field(
         default_factory=uuid4,
         primary_key=True,
@@ -54,17 +60,15 @@ class Consent(SQLModel, table=True):
         default=None,
         description="Consent expiration timestamp"
     )
-    created_at: datetime = Field(
-        default_factory=datetime.utcnow,
+    created_at: Optional[datetime] = Field(
+        default=None,
+        nullable=False,
+        sa_column_kwargs={"server_default": func.now()},
         description="Record creation timestamp"
     )
-    updated_at: datetime = Field(
-        default_factory=datetime.utcnow,
+    updated_at: Optional[datetime] = Field(
+        default=None,
+        nullable=False,
+        sa_column_kwargs={"server_default": func.now()},
         description="Record update timestamp"
     )
-    
-    class Config:
-        json_encoders = {
-            UUID: str,
-            datetime: lambda dt: dt.isoformat(),
-        }
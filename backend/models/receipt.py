@@ -3,6 +3,7 @@ from decimal import Decimal
 from typing import Optional
 from uuid import UUID, uuid4
 
+from sqlalchemy import func
 from sqlmodel import SQLModel, Field
 
 class Receipt(SQLModel, table=True):
@@ -53,14 +54,9 @@ class Receipt(SQLModel, table=True):
         default=None,
         description="Timestamp when receipt was sent"
     )
-    created_at: datetime = Field(
-        default_factory=datetime.utcnow,
+    created_at: Optional[datetime] = Field(
+        default=None,
+        nullable=False,
+        sa_column_kwargs={"server_default": func.now()},
         description="Record creation timestamp"
     )
-    
-    class Config:
-        json_encoders = {
-            UUID: str,
-            datetime: lambda dt: dt.isoformat(),
-            Decimal: str
-        }
\ No newline at end of file
@@ -13,7 +13,8 @@ from decimal import Decimal
 from typing import Optional
 from uuid import UUID, uuid4
 
-from sqlmodel import SQLModel, Field
+from sqlalchemy import func
+from sqlmodel import SQLModel, Field, Index
 
 
 class TaxPayment(SQLModel, table=True):
@@ -34,6 +35,12 @@ class TaxPayment(SQLModel, table=True):
     - failed: Payment failed, can retry
     """
     
+    # Composite indexes for the list (user + status) and duplicate-period lookups
+    __table_args__ = (
+        Index("ix_taxpayment_user_status", "user_id", "status"),
+        Index("ix_taxpayment_user_period", "user_id", "tax_period"),
+    )
+    
     id: UUID = Field(
         default_factory=uuid4,
         primary_key=True,
@@ -143,19 +150,16 @@ class TaxPayment(SQLModel, table=True):
         description="Error message if payment failed"
     )
     
-    created_at: datetime = Field(
-        default_factory=datetime.utcnow,
+    created_at: Optional[datetime] = Field(
+        default=None,
+        nullable=False,
+        sa_column_kwargs={"server_default": func.now()},
         description="Record creation timestamp"
     )
     
-    updated_at: datetime = Field(
-        default_factory=datetime.utcnow,
+    updated_at: Optional[datetime] = Field(
+        default=None,
+        nullable=False,
+        sa_column_kwargs={"server_default": func.now()},
         description="Record update timestamp"
     )
-    
-    class Config:
-        json_encoders = {
-            UUID: str,
-            datetime: lambda dt: dt.isoformat(),
-            Decimal: str,
-        }
@@ -0,0 +1,20 @@
+"""
+JSON response class backed by orjson.
+
+orjson is a compiled encoder that is several times faster than the stdlib
+json module, which matters for large payloads such as transaction lists.
+FastAPI's built-in ORJSONResponse is deprecated, so a minimal equivalent
+is defined here and set as the app's default_response_class.
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse that renders content with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
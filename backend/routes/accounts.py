@@ -1,16 +1,23 @@
 import os
 import time
+import asyncio
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+import math
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Response
 from sqlmodel import Session
 import httpx
+import numpy as np
+import orjson
 
 from database import get_session
-from services.auth_service import make_authenticated_request
-from services.bank_service import BankService
+from services import cache
+from services.auth_service import authenticate_with_bank, make_authenticated_request
+from services.bank_service import BankService, amount_filters_forwarded
+from services.http_client import get_http_client
 from services.jwt_utils import decode_token
 
 # Configure logging
@@ -18,23 +25,110 @@ logger = logging.getLogger(__name__)
 
 # Environment variables
 BASE_URL = os.getenv("BASE_URL", "https://sbank.open.bankingapi.ru")
-TX_CACHE_TTL_MINUTES = int(os.getenv("TX_CACHE_TTL_MINUTES", "15"))
+# Payments made through this service invalidate the cache, so the TTL is only a fallback
+TX_CACHE_TTL_MINUTES = int(os.getenv("TX_CACHE_TTL_MINUTES", "60"))
+TX_FILTERED_CACHE_TTL_SECONDS = int(os.getenv("TX_FILTERED_CACHE_TTL_SECONDS", "30"))
+# Pages after a full page that are fetched in the background on a cache miss
+TX_PREFETCH_PAGES = int(os.getenv("TX_PREFETCH_PAGES", "2"))
+# Account lists rarely change; they are kept under the client's transactions
+# prefix, so revoking a consent or paying drops them together with transactions
+ACCOUNTS_CACHE_TTL_SECONDS = int(os.getenv("ACCOUNTS_CACHE_TTL_SECONDS", "60"))
+# Max concurrent balance calls per request for /accounts?include_balances=true
+BALANCE_PREFETCH_CONCURRENCY = 8
 
 # Initialize router with prefix
 router = APIRouter(prefix="/v1", tags=["accounts"])
 
-# In-memory cache for transactions
-# TODO: Replace with Redis or database cache for production
-# Structure: {account_id: {"data": [...], "timestamp": float}}
-_tx_cache: Dict[str, Dict] = {}
+# Transactions are cached in services.cache (Redis when REDIS_URL is set), two kinds of entries:
+# - transactions returned by the bank, keyed by the params actually sent to it
+#   (only the list is kept, not the rest of the bank's response envelope):
+#   {"tx:{bank_name}:{client_id}:rows:{params}": {"transactions": [...], "filters_applied": bool,
+#    "timestamp": float, "columns": {"amount": [float], "date": [epoch seconds]}}}
+#   ("columns" is omitted when the bank applied the filters itself, filters_applied)
+# - locally filtered results, keyed by every request param:
+#   {"tx:{bank_name}:{client_id}:filtered:{params}": {"transactions_json": bytes, "timestamp": float}}
+# Account lists share the prefix: {"tx:{bank_name}:{client_id}:accounts:consent_id={id}": [...]}
+# In-flight bank fetches per cache key: concurrent misses await the same task
+# instead of each calling the bank (single-flight). Entries are removed on completion.
+_tx_inflight: Dict[str, asyncio.Task] = {}
+# Same for balance requests, keyed by (url, client_id, consent_id, bank_token)
+_balance_inflight: Dict[tuple, asyncio.Task] = {}
+# Recent 403 (consent revoked) / 404 (unknown account) balance answers, which do not
+# change for a given consent; client retries get the cached error without a bank call.
+# Structure: {(bank_name, account_id, consent_id): (status_code, detail)}
+_balance_error_cache: TTLCache = TTLCache(maxsize=4096, ttl=60)
+
+
+# Short-lived per-worker cache of already-filtered results, so repeated polls with
+# the same filters skip both the shared cache read and the filtering pass.
+# Results are kept as orjson-encoded bytes, so hits are never serialized again.
+# Structure: {filtered_key: (transactions_json, fetched_at)}
+_filtered_cache: TTLCache = TTLCache(maxsize=4096, ttl=TX_FILTERED_CACHE_TTL_SECONDS)
+cache.register_local_cache(_filtered_cache)
+
+
+async def get_token_data(access_token: str = Header(..., alias="Authorization")) -> Dict:
+    """
+    Decode the JWT session token from the Authorization header (FastAPI dependency).
+    
+    Declared async so FastAPI runs it inline instead of in the threadpool.
+    
+    Raises:
+        HTTPException: 401 if the token is invalid or expired
+    """
+    try:
+        return decode_token(access_token.removeprefix("Bearer "))
+    except Exception as e:
+        logger.error(f"Token decode error: {str(e)}")
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token"
+        )
+
+async def _bank_token_for(token_data: Dict, bank_name: str, client_id: Optional[str] = None) -> str:
+    """
+    Get the token to call a bank API with on behalf of the JWT's client.
+    
+    Args:
+        token_data: Decoded JWT session token
+        bank_name: Bank identifier (abank|sbank|vbank)
+        client_id: Client ID to authenticate as (defaults to the JWT's client_id)
+    
+    Returns:
+        Bank-specific token when the JWT carries a client_secret,
+        otherwise the universal fallback token from the JWT
+    
+    Raises:
+        HTTPException: 401 if the JWT has neither credential
+    """
+    client_secret = token_data.get("client_secret")
+    if not client_secret:
+        fallback_token = token_data.get("access_token")
+        if not fallback_token:
+            raise HTTPException(
+                status_code=401,
+                detail="Invalid token: missing credentials"
+            )
+        logger.debug("🔍 No client_secret in JWT, using fallback universal token for %s", bank_name)
+        return fallback_token
+    
+    logger.debug("🔍 Getting bank-specific token for %s", bank_name)
+    bank_token_data = await authenticate_with_bank(
+        client_id=client_id or token_data.get("client_id"),
+        client_secret=client_secret,
+        bank_id=bank_name
+    )
+    return bank_token_data.get("access_token")
 
 @router.get("/accounts")
 async def list_accounts(
-    access_token: str = Header(..., alias="Authorization"),
+    token_data: Dict = Depends(get_token_data),
     consent_id: Optional[str] = Header(None, alias="consent_id"),
     bank_name: Optional[str] = Header(None, alias="X-Bank-Name"),
     client_id: Optional[str] = Header(None, alias="client_id"),
-    session: Session = Depends(get_session)
+    include_balances: bool = Query(False, description="Fetch each account's balance in the same request"),
+    session: Session = Depends(get_session),
+    http: httpx.AsyncClient = Depends(get_http_client)
 ):
     """
     List all accounts available for the authenticated client per Open Banking API (Step 3).
@@ -44,11 +138,15 @@ async def list_accounts(
     - Headers: Authorization: Bearer <bank_token>, consent_id: <consent_id>, client_id: <client_id>
     
     Args:
-        access_token: JWT session token in Authorization header (Bearer <token>)
+        token_data: Decoded JWT session token from the Authorization header (Bearer <token>)
         consent_id: Consent ID for account access (consent_id header)
-        bank_name: Bank identifier (X-Bank-Name header): abank|sbank|vbank
+        bank_name: Bank identifier (X-Bank-Name header): abank|sbank|vbank.
+                   If omitted (and not in JWT), accounts from all banks are aggregated.
         client_id: Client identifier (client_id header, e.g., "team286-9")
+        include_balances: Add balance/balances to every account (fetched concurrently),
+                          saving the client one /balances call per account
         session: Database session
+        http: Shared HTTP client for bank API calls
     
     Returns:
         List of accounts from bank API
@@ -57,48 +155,28 @@ async def list_accounts(
         HTTPException: On authentication or API errors
     """
     try:
-        # Extract Bearer token
-        if access_token.startswith("Bearer "):
-            jwt_token = access_token[7:]
-        else:
-            jwt_token = access_token
-        
-        # Decode JWT to get credentials for bank-specific auth
+        # Read credentials for bank-specific auth from the JWT
         try:
-            token_data = decode_token(jwt_token)
-            client_id_stored = token_data.get("client_id")
-            client_secret = token_data.get("client_secret")
-            
             # Use values from JWT if not provided in headers
             if not client_id:
-                client_id = client_id_stored
+                client_id = token_data.get("client_id")
             if not bank_name:
-                bank_name = token_data.get("bank_name", "vbank")
+                bank_name = token_data.get("bank_name")
             if not consent_id:
                 consent_id = token_data.get("consent_id")
             
-            if not client_secret:
-                logger.warning(f"🔍 ACCOUNTS DEBUG: No client_secret in JWT, trying fallback token")
-                # Fallback to universal token if available
-                fallback_token = token_data.get("access_token")
-                if not fallback_token:
-                    raise HTTPException(
-                        status_code=401,
-                        detail="Invalid token: missing credentials"
-                    )
-                bank_token = fallback_token
-                logger.info(f"🔍 ACCOUNTS DEBUG: Using fallback universal token")
-            else:
-                # Get bank-specific token
-                from services.auth_service import authenticate_with_bank
-                logger.info(f"🔍 ACCOUNTS DEBUG: Getting bank-specific token for {bank_name}")
-                bank_token_data = await authenticate_with_bank(
-                    client_id=client_id_stored,
-                    client_secret=client_secret,
-                    bank_id=bank_name
+            if not bank_name:
+                # No bank selected - aggregate accounts from all banks concurrently
+                return await _list_accounts_all_banks(
+                    token_data=token_data,
+                    consent_id=consent_id,
+                    client_id=client_id,
+                    session=session,
+                    http=http,
+                    include_balances=include_balances
                 )
-                bank_token = bank_token_data.get("access_token")
-                logger.info(f"🔍 ACCOUNTS DEBUG: Got bank-specific token for {bank_name}")
+            
+            bank_token = await _bank_token_for(token_data, bank_name)
                 
         except HTTPException:
             raise
@@ -110,17 +188,18 @@ async def list_accounts(
             )
         
         # Initialize bank service
-        bank_service = BankService(bank_name, session)
+        bank_service = BankService(bank_name, session, http_client=http)
         
         # Get accounts from bank API (Step 3)
-        accounts = await bank_service.get_accounts(
-            bank_token=bank_token,
-            consent_id=consent_id,
-            client_id=client_id,
-            requesting_bank="team286"
-        )
+        accounts = await _get_accounts_cached(bank_service, bank_token, consent_id, client_id)
+        
+        logger.info("Successfully fetched %d accounts from %s for client %s", len(accounts), bank_name, client_id)
         
-        logger.info(f"Successfully fetched {len(accounts)} accounts from {bank_name} for client {client_id}")
+        if include_balances:
+            accounts = await _attach_balances(
+                accounts, bank_service, bank_token, consent_id, client_id, http,
+                asyncio.Semaphore(BALANCE_PREFETCH_CONCURRENCY)
+            )
         
         return {"accounts": accounts}
             
@@ -133,41 +212,209 @@ async def list_accounts(
             detail="Ошибка при получении списка счетов"
         )
 
+async def _fetch_bank_accounts(
+    bank_name: str,
+    token_data: Dict,
+    consent_id: Optional[str],
+    client_id: Optional[str],
+    session: Session,
+    http: httpx.AsyncClient,
+    balance_semaphore: Optional[asyncio.Semaphore] = None
+) -> List[Dict]:
+    """Get a bank token and fetch accounts from a single bank (with balances if a semaphore is given)"""
+    bank_token = await _bank_token_for(token_data, bank_name)
+    
+    bank_service = BankService(bank_name, session, http_client=http)
+    accounts = await _get_accounts_cached(bank_service, bank_token, consent_id, client_id)
+    if balance_semaphore is not None:
+        accounts = await _attach_balances(
+            accounts, bank_service, bank_token, consent_id, client_id, http, balance_semaphore
+        )
+    return accounts
+
+async def _get_accounts_cached(
+    bank_service: BankService,
+    bank_token: str,
+    consent_id: Optional[str],
+    client_id: Optional[str]
+) -> List[Dict]:
+    """Get a client's accounts at a bank, reusing the list for ACCOUNTS_CACHE_TTL_SECONDS"""
+    # get_accounts() falls back to the same default client_id
+    client_id = client_id or "team286"
+    key = _tx_cache_key(bank_service.bank_name, client_id, "accounts", consent_id=consent_id)
+    accounts = await cache.get_value(key)
+    if accounts is not None:
+        logger.debug("Returning cached accounts for %s", key)
+        return accounts
+    
+    accounts = await bank_service.get_accounts(
+        bank_token=bank_token,
+        consent_id=consent_id,
+        client_id=client_id,
+        requesting_bank="team286"
+    )
+    await cache.set_value(
+        key, accounts, ACCOUNTS_CACHE_TTL_SECONDS,
+        index=cache.tx_index_key(bank_service.bank_name, client_id)
+    )
+    return accounts
+
+async def _attach_balances(
+    accounts: List[Dict],
+    bank_service: BankService,
+    bank_token: str,
+    consent_id: Optional[str],
+    client_id: Optional[str],
+    http: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore
+) -> List[Dict]:
+    """
+    Fetch balances for all accounts concurrently and merge them into the accounts.
+    
+    The semaphore bounds concurrent bank calls. An account whose balance fails
+    gets balance=None instead of failing the whole list.
+    """
+    async def one(account: Dict) -> Dict:
+        account_id = account.get("accountId") or account.get("account_id") or account.get("id")
+        if not account_id:
+            return {**account, "balance": None, "balances": []}
+        try:
+            async with semaphore:
+                result = await _fetch_balance(bank_service, bank_token, account_id, consent_id, client_id, http)
+        except HTTPException as e:
+            logger.warning(f"⚠️ Failed to fetch balance for account {account_id} at {bank_service.bank_name}: {e.detail}")
+            return {**account, "balance": None, "balances": []}
+        return {**account, **result}
+    
+    return list(await asyncio.gather(*(one(account) for account in accounts)))
+
+async def _list_accounts_all_banks(
+    token_data: Dict,
+    consent_id: Optional[str],
+    client_id: Optional[str],
+    session: Session,
+    http: httpx.AsyncClient,
+    include_balances: bool = False
+) -> Dict:
+    """
+    Fetch accounts from every supported bank in parallel and merge them.
+    
+    Latency is that of the slowest bank instead of the sum of all banks.
+    Banks that fail are logged and skipped; each account is tagged with bank_name.
+    """
+    banks = list(BankService.BANK_URLS.keys())
+    # One limit shared by all banks, so the whole request stays bounded
+    balance_semaphore = asyncio.Semaphore(BALANCE_PREFETCH_CONCURRENCY) if include_balances else None
+    results = await asyncio.gather(
+        *(
+            _fetch_bank_accounts(
+                bank, token_data, consent_id, client_id, session, http, balance_semaphore
+            )
+            for bank in banks
+        ),
+        return_exceptions=True
+    )
+    
+    accounts = []
+    failed_banks = []
+    for bank, result in zip(banks, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"⚠️ Failed to fetch accounts from {bank}: {str(result)}")
+            failed_banks.append(bank)
+            continue
+        accounts.extend({**account, "bank_name": bank} for account in result)
+    
+    if len(failed_banks) == len(banks):
+        first_error = results[0]
+        if isinstance(first_error, HTTPException):
+            raise first_error
+        raise HTTPException(
+            status_code=502,
+            detail="Не удалось получить счета ни из одного банка"
+        )
+    
+    logger.info("Successfully fetched %d accounts from %d banks for client %s", len(accounts), len(banks) - len(failed_banks), client_id)
+    return {"accounts": accounts, "failed_banks": failed_banks}
+
+def _tx_cache_key(bank_name: str, client_id: str, kind: str, **params) -> str:
+    """Build a client cache key ("rows", "filtered" or "accounts" entry) from the given params"""
+    parts = ":".join(f"{k}={v}" for k, v in sorted(params.items()) if v is not None)
+    return f"{cache.tx_key_prefix(bank_name, client_id)}{kind}:{parts}"
+
+def _iso_to_epoch(value) -> float:
+    """Parse an ISO 8601 timestamp to epoch seconds (naive values are UTC), NaN if invalid"""
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return math.nan
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def _to_float(value) -> float:
+    """Convert a transaction amount to float, NaN if it is not numeric"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _build_columns(transactions: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Build columnar (amount, date epoch) arrays for vectorized filtering"""
+    count = len(transactions)
+    amounts = np.fromiter((_to_float(tx.get("amount", 0)) for tx in transactions), dtype=np.float64, count=count)
+    dates = np.fromiter((_iso_to_epoch(tx.get("date")) for tx in transactions), dtype=np.float64, count=count)
+    return amounts, dates
+
 def _filter_transactions(transactions: List[dict], 
                         min_amount: Optional[float] = None,
                         max_amount: Optional[float] = None,
                         date_from: Optional[str] = None,
-                        date_to: Optional[str] = None) -> List[dict]:
-    """Filter transactions based on amount and date criteria"""
-    filtered = transactions.copy()
-    
-    if min_amount is not None or max_amount is not None:
-        filtered = [
-            tx for tx in filtered
-            if (min_amount is None or tx.get("amount", 0) >= min_amount) and
-               (max_amount is None or tx.get("amount", 0) <= max_amount)
-        ]
+                        date_to: Optional[str] = None,
+                        columns: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[dict]:
+    """
+    Filter transactions based on amount and date criteria.
     
+    Comparisons run as NumPy masks over columnar amount/date arrays; pass
+    precomputed columns (see _build_columns) to skip building them.
+    """
+    date_from_ts = date_to_ts = None
     if date_from or date_to:
-        try:
-            date_from_dt = datetime.fromisoformat(date_from) if date_from else None
-            date_to_dt = datetime.fromisoformat(date_to) if date_to else None
-            
-            filtered = [
-                tx for tx in filtered
-                if ((not date_from_dt or datetime.fromisoformat(tx.get("date", "")) >= date_from_dt) and
-                    (not date_to_dt or datetime.fromisoformat(tx.get("date", "")) <= date_to_dt))
-            ]
-        except ValueError as e:
-            logger.warning(f"Date parsing error: {str(e)}")
+        date_from_ts = _iso_to_epoch(date_from) if date_from else None
+        date_to_ts = _iso_to_epoch(date_to) if date_to else None
+        if (date_from_ts is not None and math.isnan(date_from_ts)) or (date_to_ts is not None and math.isnan(date_to_ts)):
+            logger.warning(f"Date parsing error: from={date_from}, to={date_to}")
             # Continue with date filtering skipped
-            pass
+            date_from_ts = date_to_ts = None
+    
+    if min_amount is None and max_amount is None and date_from_ts is None and date_to_ts is None:
+        return transactions
     
-    return filtered
+    amounts, dates = columns if columns is not None else _build_columns(transactions)
+    mask = np.ones(len(transactions), dtype=bool)
+    if min_amount is not None:
+        mask &= amounts >= min_amount
+    if max_amount is not None:
+        mask &= amounts <= max_amount
+    # Rows with an unparseable date are NaN here and never match a date bound,
+    # so one malformed row does not disable date filtering for the rest
+    if date_from_ts is not None:
+        mask &= dates >= date_from_ts
+    if date_to_ts is not None:
+        mask &= dates <= date_to_ts
+    
+    return [transactions[i] for i in np.flatnonzero(mask)]
+
+def _transactions_response(transactions_json: bytes, fetched_at: Optional[float] = None) -> Response:
+    """Build the transactions response around an already-encoded transactions array"""
+    if fetched_at is None:
+        tail = b',"from_cache":false}'
+    else:
+        tail = b',"from_cache":true,"cache_age_seconds":%d}' % int(time.time() - fetched_at)
+    return Response(content=b'{"transactions":' + transactions_json + tail, media_type="application/json")
 
 @router.get("/transactions")
 async def list_transactions(
-    access_token: str = Header(..., alias="Authorization"),
+    token_data: Dict = Depends(get_token_data),
     consent_id: str = Header(..., alias="consent_id"),
     bank_name: str = Header(..., alias="X-Bank-Name"),
     client_id: str = Header(..., alias="client_id"),
@@ -181,7 +428,8 @@ async def list_transactions(
     offset: int = Query(0, description="Offset for pagination"),
     min_amount: Optional[float] = Query(None, description="Minimum transaction amount"),
     max_amount: Optional[float] = Query(None, description="Maximum transaction amount"),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    http: httpx.AsyncClient = Depends(get_http_client)
 ):
     """
     List transactions for authenticated client per Open Banking API (Step 4).
@@ -191,7 +439,7 @@ async def list_transactions(
     - Headers: Authorization: Bearer <bank_token>, consent_id: <consent_id>, client_id: <client_id>
     
     Args:
-        access_token: JWT session token in Authorization header (Bearer <token>)
+        token_data: Decoded JWT session token from the Authorization header (Bearer <token>)
         consent_id: Consent ID for transaction access (consent_id header)
         bank_name: Bank identifier (X-Bank-Name header): abank|sbank|vbank
         client_id: Client identifier (client_id header, e.g., "team286-9")
@@ -200,121 +448,170 @@ async def list_transactions(
         min_amount: Minimum transaction amount
         max_amount: Maximum transaction amount
         session: Database session
+        http: Shared HTTP client for bank API calls
     
     Returns:
         Dict with transactions list
     """
-    logger.info(f"📱 TX REQUEST: bank_name={bank_name}, account_id={account_id}, from_date={from_date}, to_date={to_date}, limit={limit}")
+    logger.debug("📱 TX REQUEST: bank_name=%s, account_id=%s, from_date=%s, to_date=%s, limit=%s", bank_name, account_id, from_date, to_date, limit)
     
     try:
-        # Extract Bearer token
-        if access_token.startswith("Bearer "):
-            jwt_token = access_token[7:]
-        else:
-            jwt_token = access_token
-        
-        # Decode JWT to get credentials for bank-specific auth
-        try:
-            token_data = decode_token(jwt_token)
-            client_id_stored = token_data.get("client_id")
-            client_secret = token_data.get("client_secret")
-            
-            if not client_secret:
-                logger.warning(f"🔍 TRANSACTIONS DEBUG: No client_secret in JWT, trying fallback token")
-                # Fallback to universal token if available
-                fallback_token = token_data.get("access_token")
-                if not fallback_token:
-                    raise HTTPException(
-                        status_code=401,
-                        detail="Invalid token: missing credentials"
-                    )
-                bank_token = fallback_token
-                logger.info(f"🔍 TRANSACTIONS DEBUG: Using fallback universal token")
-            else:
-                # Get bank-specific token
-                from services.auth_service import authenticate_with_bank
-                logger.info(f"🔍 TRANSACTIONS DEBUG: Getting bank-specific token for {bank_name}")
-                bank_token_data = await authenticate_with_bank(
-                    client_id=client_id_stored,
-                    client_secret=client_secret,
-                    bank_id=bank_name
-                )
-                bank_token = bank_token_data.get("access_token")
-                logger.info(f"🔍 TRANSACTIONS DEBUG: Got bank-specific token for {bank_name}")
-                
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Token decode error: {str(e)}")
+        # Reject JWTs without bank credentials before touching the cache
+        if not token_data.get("client_secret") and not token_data.get("access_token"):
             raise HTTPException(
                 status_code=401,
-                detail="Invalid or expired token"
+                detail="Invalid token: missing credentials"
             )
         
-        # Check cache first
-        cache_key = f"{bank_name}:{client_id}"
-        current_time = time.time()
-        cache_entry = _tx_cache.get(cache_key)
-        
-        if cache_entry:
-            cache_age = current_time - cache_entry["timestamp"]
-            if cache_age < TX_CACHE_TTL_MINUTES * 60:
-                logger.debug(f"Returning cached transactions for {cache_key}")
-                transactions = cache_entry["data"].get("transactions", [])
-                return {
-                    "transactions": _filter_transactions(
-                        transactions,
-                        min_amount=min_amount,
-                        max_amount=max_amount,
-                        date_from=from_date,
-                        date_to=to_date
-                    ),
-                    "from_cache": True,
-                    "cache_age_seconds": int(cache_age)
-                }
-        
-        # Fetch fresh data from bank API (Step 4)
-        bank_service = BankService(bank_name, session)
-        
-        logger.info(f"📱 FETCHING: Calling BankService.get_transactions for {bank_name}, account_id={account_id}")
+        async def get_bank_token() -> str:
+            """Exchange credentials for a bank token - only needed on a cache miss"""
+            try:
+                return await _bank_token_for(token_data, bank_name)
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error(f"Bank token error: {str(e)}")
+                raise HTTPException(
+                    status_code=401,
+                    detail="Invalid or expired token"
+                )
         
-        data = await bank_service.get_transactions(
-            bank_token=bank_token,
-            consent_id=consent_id,
-            account_id=account_id,  # Use accountId from header
-            client_id=client_id,
-            requesting_bank="team286",
+        # Check caches first: the filtered result for these exact params, then the
+        # raw bank response, which is shared by filter combos the bank never saw
+        upstream_params = dict(
+            account_id=account_id,
             page=page,
             limit=limit,
+            offset=offset,
             from_date=from_date,
             to_date=to_date,
             from_booking_date_time=from_booking_date_time,
-            to_booking_date_time=to_booking_date_time,
-            offset=offset
+            to_booking_date_time=to_booking_date_time
         )
+        amount_params = dict(min_amount=min_amount, max_amount=max_amount)
+        filtered_key = _tx_cache_key(bank_name, client_id, "filtered", **upstream_params, **amount_params)
         
-        logger.info(f"📱 RESPONSE: Got data from BankService: {len(data.get('transactions', []))} transactions")
+        def raw_key_for(page_no: int) -> str:
+            return _tx_cache_key(
+                bank_name,
+                client_id,
+                "rows",
+                **{**upstream_params, "page": page_no},
+                **(amount_params if amount_filters_forwarded(bank_name) else {})
+            )
         
-        # Update cache
-        _tx_cache[cache_key] = {
-            "data": data,
-            "timestamp": current_time
-        }
+        raw_key = raw_key_for(page)
+        tx_index = cache.tx_index_key(bank_name, client_id)
+        has_filters = any(v is not None for v in (min_amount, max_amount, from_date, to_date))
         
-        transactions = data.get("transactions", [])
+        filtered_hit = _filtered_cache.get(filtered_key)
+        if filtered_hit is not None:
+            return _transactions_response(*filtered_hit)
         
-        logger.info(f"Fetched {len(transactions)} transactions for client {client_id} from {bank_name}")
+        if has_filters:
+            filtered_entry = await cache.get_value(filtered_key)
+            if filtered_entry is not None:
+                _filtered_cache[filtered_key] = (filtered_entry["transactions_json"], filtered_entry["timestamp"])
+                return _transactions_response(filtered_entry["transactions_json"], filtered_entry["timestamp"])
         
-        return {
-            "transactions": _filter_transactions(
+        cache_entry = await cache.get_value(raw_key)
+        from_cache = cache_entry is not None
+        
+        if cache_entry is None:
+            async def fetch_transactions(page_no: int, key: str) -> dict:
+                # Fetch fresh data from bank API (Step 4)
+                bank_token = await get_bank_token()
+                bank_service = BankService(bank_name, session, http_client=http)
+                
+                logger.debug("📱 FETCHING: Calling BankService.get_transactions for %s, account_id=%s, page=%s", bank_name, account_id, page_no)
+                
+                data = await bank_service.get_transactions(
+                    bank_token=bank_token,
+                    consent_id=consent_id,
+                    account_id=account_id,  # Use accountId from header
+                    client_id=client_id,
+                    requesting_bank="team286",
+                    page=page_no,
+                    limit=limit,
+                    from_date=from_date,
+                    to_date=to_date,
+                    from_booking_date_time=from_booking_date_time,
+                    to_booking_date_time=to_booking_date_time,
+                    offset=offset,
+                    min_amount=min_amount,
+                    max_amount=max_amount
+                )
+                
+                # Update cache - amounts and dates are parsed once here, not on every filter
+                entry = {
+                    "transactions": data.get("transactions", []),
+                    "filters_applied": data.get("filters_applied", False),
+                    "timestamp": time.time()
+                }
+                if not entry["filters_applied"]:
+                    amounts, dates = _build_columns(entry["transactions"])
+                    entry["columns"] = {"amount": amounts.tolist(), "date": dates.tolist()}
+                await cache.set_value(key, entry, TX_CACHE_TTL_MINUTES * 60, index=tx_index)
+                return entry
+            
+            async def prefetch_page(page_no: int, key: str) -> Optional[dict]:
+                try:
+                    return await cache.get_value(key) or await fetch_transactions(page_no, key)
+                except Exception as e:
+                    logger.warning(f"Prefetch of page {page_no} for {client_id} at {bank_name} failed: {str(e)}")
+                    return None
+            
+            cache_entry = await asyncio.shield(
+                cache.single_flight(_tx_inflight, raw_key, lambda: fetch_transactions(page, raw_key))
+            )
+            if cache_entry is None:
+                # Joined a background prefetch that failed - fetch (and report errors) here
+                cache_entry = await fetch_transactions(page, raw_key)
+            
+            # A full page means the client will likely ask for the next ones: warm them
+            # in the background (tracked in _tx_inflight, so a request for one joins it)
+            if len(cache_entry["transactions"]) >= limit:
+                for page_no in range(page + 1, page + 1 + TX_PREFETCH_PAGES):
+                    key = raw_key_for(page_no)
+                    cache.single_flight(_tx_inflight, key, lambda page_no=page_no, key=key: prefetch_page(page_no, key))
+        
+        transactions = cache_entry["transactions"]
+        if not has_filters or cache_entry["filters_applied"]:
+            # Nothing to filter, or the bank filtered server-side
+            transactions_json = orjson.dumps(transactions, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            # Covers banks that ignore (or rejected) the forwarded filters
+            columns = cache_entry.get("columns")
+            filtered = _filter_transactions(
                 transactions,
                 min_amount=min_amount,
                 max_amount=max_amount,
                 date_from=from_date,
-                date_to=to_date
-            ),
-            "from_cache": False
-        }
+                date_to=to_date,
+                columns=(
+                    np.asarray(columns["amount"], dtype=np.float64),
+                    np.asarray(columns["date"], dtype=np.float64)
+                ) if columns else None
+            )
+            transactions_json = orjson.dumps(filtered, option=orjson.OPT_NON_STR_KEYS)
+            # Share the result with other workers until the raw entry would expire
+            remaining_ttl = TX_CACHE_TTL_MINUTES * 60 - int(time.time() - cache_entry["timestamp"])
+            if remaining_ttl > 0:
+                await cache.set_value(
+                    filtered_key,
+                    {"transactions_json": transactions_json, "timestamp": cache_entry["timestamp"]},
+                    remaining_ttl,
+                    index=tx_index
+                )
+        _filtered_cache[filtered_key] = (transactions_json, cache_entry["timestamp"])
+        
+        if from_cache:
+            logger.debug("Returning cached transactions for %s", raw_key)
+            return _transactions_response(transactions_json, cache_entry["timestamp"])
+        
+        logger.info("Fetched %d transactions for client %s from %s", len(transactions), client_id, bank_name)
+        
+        return _transactions_response(transactions_json)
             
     except HTTPException:
         raise
@@ -326,14 +623,149 @@ async def list_transactions(
         )
 
 
+def _as_list(value) -> list:
+    return value if isinstance(value, list) else [value]
+
+def _balances_open_banking(data) -> Optional[list]:
+    """Read balances from the Open Banking sandbox shape {data: {balance: [...]}}, None if it differs"""
+    try:
+        return _as_list(data["data"]["balance"])
+    except (KeyError, TypeError):
+        return None
+
+def _balances_generic(data) -> list:
+    """Extract balances from any of the known bank response structures"""
+    # ABank returns: {data: {balance: [...]}}
+    # Other banks may return: {balance: {...}} or {balances: [...]}
+    if isinstance(data, list):
+        return data
+    if not isinstance(data, dict):
+        return []
+    # Check for wrapped response: {data: {balance: [...]}}
+    if "data" in data and isinstance(data["data"], dict):
+        inner_data = data["data"]
+        if "balance" in inner_data:
+            return _as_list(inner_data["balance"])
+        if "balances" in inner_data:
+            return _as_list(inner_data["balances"])
+        return []
+    # Check for direct balance fields
+    if "balance" in data:
+        return _as_list(data["balance"])
+    if "balances" in data:
+        return _as_list(data["balances"])
+    # Unknown structure - log and use default
+    logger.warning(f"⚠️ BALANCES: Unknown response structure: {data}")
+    return []
+
+# Per-bank balance parsers; unknown banks or unexpected shapes use _balances_generic
+_BALANCE_NORMALIZERS = {
+    "abank": _balances_open_banking,
+    "sbank": _balances_open_banking,
+    "vbank": _balances_open_banking
+}
+
+async def _fetch_balance(
+    bank_service: BankService,
+    bank_token: str,
+    account_id: str,
+    consent_id: Optional[str],
+    client_id: Optional[str],
+    http: httpx.AsyncClient
+) -> Dict:
+    """
+    Fetch and normalize the balance of one account from the bank API.
+    
+    Returns:
+        Dict with balance (first entry) and balances (all entries)
+    
+    Raises:
+        HTTPException: On bank API or connection errors
+    """
+    error_key = (bank_service.bank_name, account_id, consent_id)
+    cached_error = _balance_error_cache.get(error_key)
+    if cached_error is not None:
+        raise HTTPException(*cached_error)
+    
+    logger.debug("💰 BALANCES: Fetching balance for account %s from %s (X-Consent-Id: %s, client_id: %s)", account_id, bank_service.bank_name, consent_id, client_id)
+    
+    # Get balance from bank API
+    url = f"{bank_service.base_url}/accounts/{account_id}/balances"
+    
+    headers = bank_service.account_headers(bank_token, "team286", consent_id or "")
+    
+    params = {
+        "client_id": client_id or "team286"
+    }
+    
+    logger.debug("💰 BALANCES: GET %s params=%s", url, params)
+    
+    try:
+        # Identical concurrent balance requests (e.g. dashboard refreshes) share one bank call
+        response = await asyncio.shield(cache.single_flight(
+            _balance_inflight,
+            (url, params["client_id"], consent_id, bank_token),
+            lambda: http.get(url, headers=headers, params=params, timeout=10)
+        ))
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("💰 BALANCES: Response %s: %s", response.status_code, response.text)
+        
+        if response.status_code == 401:
+            raise HTTPException(
+                status_code=401,
+                detail="Ошибка аутентификации"
+            )
+        
+        if response.status_code == 403:
+            error = (403, "Согласие не действительно или отозвано")
+            _balance_error_cache[error_key] = error
+            raise HTTPException(*error)
+        
+        if response.status_code == 404:
+            logger.error(f"❌ BALANCES: Bank API error: 404 - {response.text}")
+            error = (404, f"Ошибка получения баланса: {response.text}")
+            _balance_error_cache[error_key] = error
+            raise HTTPException(*error)
+        
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        _balance_error_cache.pop(error_key, None)
+        
+        # Normalize response - sandbox banks share one shape, generic parser covers the rest
+        balances = _BALANCE_NORMALIZERS.get(bank_service.bank_name, _balances_generic)(data)
+        if balances is None:
+            balances = _balances_generic(data)
+        
+        logger.debug("✅ BALANCES: Got %d balance(s) for account %s", len(balances), account_id)
+        
+        return {
+            "balance": balances[0] if balances else {"amount": 0, "currency": "RUB"},
+            "balances": balances
+        }
+        
+    except httpx.HTTPStatusError as e:
+        logger.error(f"❌ BALANCES: Bank API error: {e.response.status_code} - {e.response.text}")
+        raise HTTPException(
+            status_code=e.response.status_code,
+            detail=f"Ошибка получения баланса: {e.response.text}"
+        )
+    except httpx.RequestError as e:
+        logger.error(f"❌ BALANCES: Request error: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail="Ошибка соединения с банком"
+        )
+
 @router.get("/accounts/{account_id}/balances")
 async def get_account_balance(
     account_id: str,
-    access_token: str = Header(..., alias="Authorization"),
+    token_data: Dict = Depends(get_token_data),
     consent_id: Optional[str] = Header(None, alias="consent_id"),
     bank_name: Optional[str] = Header(None, alias="X-Bank-Name"),
     client_id: Optional[str] = Header(None, alias="client_id"),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    http: httpx.AsyncClient = Depends(get_http_client)
 ):
     """
     Get balance for a specific account per Open Banking API.
@@ -344,53 +776,24 @@ async def get_account_balance(
     
     Args:
         account_id: Account identifier from account list
-        access_token: JWT session token in Authorization header
+        token_data: Decoded JWT session token from the Authorization header
         consent_id: Consent ID for account access
         bank_name: Bank identifier (abank|sbank|vbank)
         client_id: Client identifier
         session: Database session
+        http: Shared HTTP client for bank API calls
     
     Returns:
         Balance information with amount and currency
     """
     try:
-        # Extract Bearer token
-        if access_token.startswith("Bearer "):
-            jwt_token = access_token[7:]
-        else:
-            jwt_token = access_token
-        
-        # Decode JWT to get credentials
+        # Read credentials from the JWT
         try:
-            token_data = decode_token(jwt_token)
-            client_secret = token_data.get("client_secret")
-            
-            if not client_secret:
-                logger.warning(f"🔍 BALANCES: No client_secret in JWT, trying fallback token")
-                bank_token = token_data.get("access_token")
-                if not bank_token:
-                    raise HTTPException(
-                        status_code=401,
-                        detail="Invalid token: missing credentials"
-                    )
-            else:
-                # Get bank-specific token
-                from services.auth_service import authenticate_with_bank
-                logger.info(f"🔍 BALANCES: Getting bank-specific token for {bank_name}")
-                
-                # Extract base client_id (team286 part only, without -9 suffix)
-                base_client_id = token_data.get("client_id", "team286")
-                if "-" in str(base_client_id):
-                    base_client_id = base_client_id.split("-")[0]
-                
-                logger.info(f"🔍 BALANCES: Using base_client_id={base_client_id} for bank token")
-                
-                bank_token_data = await authenticate_with_bank(
-                    client_id=base_client_id,
-                    client_secret=client_secret,
-                    bank_id=bank_name
-                )
-                bank_token = bank_token_data.get("access_token")
+            # Bank tokens are issued to the base client_id (team286 part only, without -9 suffix)
+            base_client_id = token_data.get("client_id", "team286")
+            if base_client_id:
+                base_client_id = str(base_client_id).split("-")[0]
+            bank_token = await _bank_token_for(token_data, bank_name, client_id=base_client_id)
                 
         except HTTPException:
             raise
@@ -402,96 +805,9 @@ async def get_account_balance(
             )
         
         # Initialize bank service
-        bank_service = BankService(bank_name, session)
-        
-        logger.info(f"💰 BALANCES: Fetching balance for account {account_id} from {bank_name}")
-        logger.info(f"   Headers: Authorization: Bearer {bank_token[:20]}..., X-Consent-Id: {consent_id}, client_id: {client_id}")
+        bank_service = BankService(bank_name, session, http_client=http)
         
-        # Get balance from bank API
-        url = f"{bank_service.base_url}/accounts/{account_id}/balances"
-        
-        headers = {
-            "Authorization": f"Bearer {bank_token}",
-            "X-Requesting-Bank": "team286",
-            "X-Consent-Id": consent_id or ""
-        }
-        
-        params = {
-            "client_id": client_id or "team286"
-        }
-        
-        logger.info(f"💰 BALANCES: GET {url}")
-        logger.info(f"💰 BALANCES: Headers: {headers}")
-        logger.info(f"💰 BALANCES: Params: {params}")
-        
-        try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(url, headers=headers, params=params)
-                
-                logger.info(f"💰 BALANCES: Response status: {response.status_code}")
-                logger.info(f"💰 BALANCES: Response body: {response.text}")
-                
-                if response.status_code == 401:
-                    raise HTTPException(
-                        status_code=401,
-                        detail="Ошибка аутентификации"
-                    )
-                
-                if response.status_code == 403:
-                    raise HTTPException(
-                        status_code=403,
-                        detail="Согласие не действительно или отозвано"
-                    )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                # Normalize response - different banks return different structures
-                # ABank returns: {data: {balance: [...]}}
-                # Other banks may return: {balance: {...}} or {balances: [...]}
-                balances = []
-                if isinstance(data, dict):
-                    # Check for wrapped response: {data: {balance: [...]}}
-                    if "data" in data and isinstance(data["data"], dict):
-                        inner_data = data["data"]
-                        if "balance" in inner_data:
-                            balances = inner_data["balance"] if isinstance(inner_data["balance"], list) else [inner_data["balance"]]
-                        elif "balances" in inner_data:
-                            balances = inner_data["balances"] if isinstance(inner_data["balances"], list) else [inner_data["balances"]]
-                    # Check for direct balance fields
-                    elif "balance" in data:
-                        balances = [data["balance"]] if not isinstance(data["balance"], list) else data["balance"]
-                    elif "balances" in data:
-                        balances = data["balances"] if isinstance(data["balances"], list) else [data["balances"]]
-                    else:
-                        # Unknown structure - log and use default
-                        logger.warning(f"⚠️ BALANCES: Unknown response structure: {data}")
-                        balances = []
-                elif isinstance(data, list):
-                    balances = data
-                
-                logger.info(f"✅ BALANCES: Got {len(balances)} balance(s) for account {account_id}")
-                
-                if balances:
-                    logger.info(f"✅ BALANCES: Balance details: {balances[0]}")
-                
-                return {
-                    "balance": balances[0] if balances else {"amount": 0, "currency": "RUB"},
-                    "balances": balances
-                }
-                
-        except httpx.HTTPStatusError as e:
-            logger.error(f"❌ BALANCES: Bank API error: {e.response.status_code} - {e.response.text}")
-            raise HTTPException(
-                status_code=e.response.status_code,
-                detail=f"Ошибка получения баланса: {e.response.text}"
-            )
-        except httpx.RequestError as e:
-            logger.error(f"❌ BALANCES: Request error: {str(e)}")
-            raise HTTPException(
-                status_code=503,
-                detail="Ошибка соединения с банком"
-            )
+        return await _fetch_balance(bank_service, bank_token, account_id, consent_id, client_id, http)
             
     except HTTPException:
         raise
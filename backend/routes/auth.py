@@ -7,14 +7,16 @@ Endpoints:
 - GET /api/consents/{consent_id}/status - Check consent status for polling
 """
 
+import asyncio
 import logging
-import uuid
-from typing import Optional
+from typing import Dict, Optional
 
+from cachetools import TTLCache
 from fastapi import APIRouter, HTTPException, status, Body, Depends, Header
 from pydantic import BaseModel
 from sqlmodel import Session, select
 
+from services import cache
 from services.auth_service import authenticate_with_bank, make_authenticated_request
 from services.jwt_utils import encode_token, decode_token
 from services.bank_service import BankService
@@ -25,6 +27,18 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["auth"])
 
+# Banks accepted as bank_id (lowercase)
+_VALID_BANKS = frozenset({"vbank", "abank", "sbank"})
+_INVALID_BANK_DETAIL = "Invalid bank_id. Must be one of: vbank, abank, sbank"
+
+# Frontends poll consent status every few seconds; polls within this window (and
+# concurrent ones, via single-flight) share one bank call. Keys include the
+# caller's token, so a cached status is only served to callers the bank accepted.
+# Structure: {(bank_id, consent_id, access_token): bank response}
+CONSENT_STATUS_CACHE_TTL_SECONDS = 2
+_consent_status_cache: TTLCache = TTLCache(maxsize=10_000, ttl=CONSENT_STATUS_CACHE_TTL_SECONDS)
+_consent_status_inflight: Dict[tuple, asyncio.Task] = {}
+
 
 # Request/Response Models
 class AuthRequest(BaseModel):
@@ -95,23 +109,17 @@ async def authenticate(request: AuthRequest):
     - Step 1: User enters login (team286) to get access_token
     - Step 2: User selects user_id (1-9) which forms client_id for consents (team286-9)
     """
-    # 🔍 ЛОГИРУЕМ ЧТО ПРИШЛО
-    logger.info(f"🔍 BACKEND DEBUG: POST /api/authenticate received")
-    logger.info(f"🔍 BACKEND DEBUG: Request model fields: {request.model_fields_set}")
-    logger.info(f"🔍 BACKEND DEBUG: client_id = '{request.client_id}' (type: {type(request.client_id).__name__})")
-    logger.info(f"🔍 BACKEND DEBUG: client_secret = '{'*' * len(request.client_secret)}' (length: {len(request.client_secret)})")
-    logger.info(f"🔍 BACKEND DEBUG: user_id = {request.user_id} (type: {type(request.user_id).__name__})")
+    # 🔍 ЛОГИРУЕМ ЧТО ПРИШЛО (секрет не логируется)
+    logger.debug("🔍 BACKEND DEBUG: POST /api/authenticate client_id=%s user_id=%s", request.client_id, request.user_id)
     
     try:
         # Вызываем сервис аутентификации
-        logger.info(f"🔍 BACKEND DEBUG: Calling authenticate_with_bank()")
         token_data = await authenticate_with_bank(
             client_id=request.client_id,
             client_secret=request.client_secret
         )
         
-        logger.info(f"🔍 BACKEND DEBUG: authenticate_with_bank returned keys: {list(token_data.keys())}")
-        logger.info(f"🔍 BACKEND DEBUG: access_token present: {'access_token' in token_data}")
+        logger.debug("🔍 BACKEND DEBUG: authenticate_with_bank returned access_token: %s", "access_token" in token_data)
         
         # Создаём JWT (access_token универсальный для всех банков, сохраняем secret для переаутентификации)
         jwt_token = encode_token(
@@ -122,8 +130,6 @@ async def authenticate(request: AuthRequest):
             client_secret=request.client_secret  # Сохраняем для получения токенов других банков
         )
         
-        logger.info(f"🔍 BACKEND DEBUG: JWT token created successfully")
-        
         return {
             "access_token": jwt_token,
             "token_type": "bearer",
@@ -205,15 +211,14 @@ async def create_consent(
 
     try:
         bank_id_lower = request.bank_id.lower()
-        logger.info(f"🔍 CONSENT DEBUG: Creating consent for user {request.user_id} and bank {bank_id_lower}")
+        logger.debug("🔍 CONSENT DEBUG: Creating consent for user %s and bank %s", request.user_id, bank_id_lower)
         
         # Validate bank_id
-        valid_banks = ['vbank', 'abank', 'sbank']
-        if bank_id_lower not in valid_banks:
+        if bank_id_lower not in _VALID_BANKS:
             logger.warning(f"🔍 CONSENT DEBUG: Invalid bank_id: {request.bank_id}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid bank_id. Must be one of: {', '.join(valid_banks)}"
+                detail=_INVALID_BANK_DETAIL
             )
         
         # Check if active consent already exists for this user and bank
@@ -226,7 +231,7 @@ async def create_consent(
         ).first()
         
         if existing_consent:
-            logger.info(f"🔍 CONSENT DEBUG: Active consent already exists for {request.user_id} with {bank_id_lower}")
+            logger.debug("🔍 CONSENT DEBUG: Active consent already exists for %s with %s", request.user_id, bank_id_lower)
             return ConsentResponse(
                 status="success",
                 consent_id=existing_consent.consent_id
@@ -244,8 +249,6 @@ async def create_consent(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Invalid token: missing credentials"
                 )
-            
-            logger.info(f"🔍 CONSENT DEBUG: Decoded JWT token, client_id: {client_id}")
         except HTTPException:
             raise
         except Exception as e:
@@ -256,7 +259,7 @@ async def create_consent(
             )
         
         # Get bank-specific token for the selected bank
-        logger.info(f"🔍 CONSENT DEBUG: Getting token for bank {bank_id_lower}")
+        logger.debug("🔍 CONSENT DEBUG: Getting token for bank %s", bank_id_lower)
         try:
             bank_token_data = await authenticate_with_bank(
                 client_id=client_id,
@@ -264,7 +267,6 @@ async def create_consent(
                 bank_id=bank_id_lower
             )
             bank_token = bank_token_data.get("access_token")
-            logger.info(f"🔍 CONSENT DEBUG: Got token for bank {bank_id_lower}")
         except HTTPException:
             raise
         except Exception as e:
@@ -277,22 +279,18 @@ async def create_consent(
         # Call BankService to create consent
         bank_service = BankService(bank_id_lower, session)
         
-        logger.info(f"🔍 CONSENT DEBUG: Calling BankService.create_consent()")
-        
         response = await bank_service.create_consent(
             bank_token=bank_token,
             client_id=request.user_id,
             requesting_bank="team286"
         )
         
-        logger.info(f"🔍 CONSENT DEBUG: BankService response: {response}")
-        
         consent_id = response.get("consent_id")
         request_id = response.get("request_id")
         consent_status = response.get("status", "unknown")
         redirect_url = response.get("redirect_url")
         
-        logger.info(f"🔍 CONSENT DEBUG: consent_id={consent_id}, request_id={request_id}, status={consent_status}")
+        logger.info("🔍 CONSENT DEBUG: consent_id=%s, request_id=%s, status=%s", consent_id, request_id, consent_status)
         
         # Return response based on consent status
         if consent_status in ["pending", "awaitingAuthorization"]:
@@ -567,15 +565,23 @@ async def get_consent_status(
         
         # Call bank API: GET /account-consents/{consent_id}
         try:
-            response = await make_authenticated_request(
-                method="GET",
-                endpoint=f"/account-consents/{consent_id}",
-                access_token=access_token,
-                bank_id=bank_id_lower,
-                requesting_bank="team286"
-            )
-            
-            logger.info(f"🔍 STATUS DEBUG: Bank response: {response}")
+            key = (bank_id_lower, consent_id, access_token)
+            response = _consent_status_cache.get(key)
+            if response is None:
+                response = await asyncio.shield(cache.single_flight(
+                    _consent_status_inflight,
+                    key,
+                    lambda: make_authenticated_request(
+                        method="GET",
+                        endpoint=f"/account-consents/{consent_id}",
+                        access_token=access_token,
+                        bank_id=bank_id_lower,
+                        requesting_bank="team286"
+                    )
+                ))
+                # Failures are not cached, so the next poll retries the bank
+                _consent_status_cache[key] = response
+                logger.debug("🔍 STATUS DEBUG: Bank response: %s", response)
             
             status_code = response.get("status", "unknown")
             logger.info(f"🔍 STATUS DEBUG: Current consent status: {status_code}")
@@ -783,11 +789,10 @@ async def revoke_consent(
         bank_id_lower = bank_id.lower()
         
         # Validate bank_id
-        valid_banks = ['vbank', 'abank', 'sbank']
-        if bank_id_lower not in valid_banks:
+        if bank_id_lower not in _VALID_BANKS:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid bank_id. Must be one of: {', '.join(valid_banks)}"
+                detail=_INVALID_BANK_DETAIL
             )
         
         # Decode JWT to get bank token
@@ -848,6 +853,7 @@ async def revoke_consent(
                     session.delete(db_consent)
                     session.commit()
                     logger.info(f"🔍 REVOKE DEBUG: Deleted consent from DB")
+                await cache.invalidate_transactions(bank_id_lower, client_id)
                 
                 return {
                     "status": "success",
@@ -23,7 +23,9 @@ from sqlmodel import Session, select
 
 from database import get_session
 from models.tax_payment import TaxPayment
+from services.auth_service import authenticate_with_bank
 from services.bank_service import BankService
+from services.jwt_utils import decode_token
 
 logger = logging.getLogger(__name__)
 
@@ -241,7 +243,6 @@ async def pay_tax(
         bank_service = BankService(request.bank_name, session)
         
         # Decode JWT token to get client_secret
-        from services.jwt_utils import decode_token
         
         logger.info(f"💳 PAYMENT: Decoding JWT token from frontend")
         logger.info(f"💳 PAYMENT: Token preview: {request.bank_token[:50]}...")
@@ -270,7 +271,6 @@ async def pay_tax(
             )
         
         # Get bank-specific token (not user JWT token)
-        from services.auth_service import authenticate_with_bank
         
         # Extract base client_id (team286 part only) for bank token
         base_client_id = tax_payment.user_id or "team286"
@@ -580,7 +580,6 @@ async def confirm_payment_approval(
         bank_service = BankService(tax_payment.bank_name, session)
         
         # Decode JWT token to get client_secret
-        from services.jwt_utils import decode_token
         
         logger.info(f"💳 PAYMENT APPROVAL: Confirming payment approval for tax {payment_id}")
         
@@ -601,7 +600,6 @@ async def confirm_payment_approval(
             )
         
         # Get bank token using client_secret from JWT
-        from services.auth_service import authenticate_with_bank
         
         base_client_id = tax_payment.user_id or "team286"
         if "-" in str(base_client_id):
@@ -7,6 +7,7 @@ This service handles:
 3. Token validation and refresh
 """
 
+import hashlib
 import logging
 import time
 import asyncio
@@ -17,15 +18,31 @@ import os
 import httpx
 from fastapi import HTTPException, status
 
+from services.http_client import get_http_client
+
 logger = logging.getLogger(__name__)
 
 # Base URL for external banking API
 BASE_URL = os.getenv("BASE_URL", "https://sbank.open.bankingapi.ru")
 
+# Per-bank API base URLs; unknown banks fall back to BASE_URL
+BANK_BASE_URLS: Dict[str, str] = {
+    "abank": "https://abank.open.bankingapi.ru",
+    "sbank": "https://sbank.open.bankingapi.ru",
+    "vbank": "https://vbank.open.bankingapi.ru"
+}
+
 # In-memory token cache: {team_id: {"token": str, "expires_at": float}}
 _token_cache: Dict[str, Dict] = {}
 _token_locks: Dict[str, asyncio.Lock] = {}
 
+# Bank-specific token cache: {(client_id, bank_id, secret_hash): {"data": dict, "expires_at": float}}
+_bank_token_cache: Dict[Tuple[str, str, str], Dict] = {}
+# Refresh bank tokens this many seconds before they expire
+BANK_TOKEN_REFRESH_MARGIN_SECONDS = 30
+# Used when the bank response has no expires_in
+BANK_TOKEN_DEFAULT_TTL_SECONDS = 300
+
 
 def _get_lock(team_id: str) -> asyncio.Lock:
     """Get or create an asyncio lock for a team."""
@@ -77,73 +94,74 @@ async def authenticate_team(client_id: str, client_secret: str) -> Tuple[str, in
         # Call external API to authenticate
         try:
             logger.info(f"Authenticating team {client_id}")
-            async with httpx.AsyncClient(timeout=10) as client:
-                url = f"{BASE_URL}/auth/bank-token"
-                logger.info(f"Calling {url} with client_id={client_id}")
-                
-                response = await client.post(
-                    url,
-                    params={
-                        "client_id": client_id,
-                        "client_secret": client_secret
-                    }
+            client = get_http_client()
+            url = f"{BASE_URL}/auth/bank-token"
+            logger.info(f"Calling {url} with client_id={client_id}")
+            
+            response = await client.post(
+                url,
+                params={
+                    "client_id": client_id,
+                    "client_secret": client_secret
+                },
+                timeout=10
+            )
+            
+            logger.info(f"Response status: {response.status_code}")
+            logger.info(f"Response body: {response.text[:200]}")
+
+            # Handle authentication errors
+            if response.status_code == 401:
+                logger.warning(f"Invalid credentials for team {client_id}: {response.text}")
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Неверные данные авторизации"
                 )
-                
-                logger.info(f"Response status: {response.status_code}")
-                logger.info(f"Response body: {response.text[:200]}")
-
-                # Handle authentication errors
-                if response.status_code == 401:
-                    logger.warning(f"Invalid credentials for team {client_id}: {response.text}")
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Неверные данные авторизации"
-                    )
-                elif response.status_code == 400:
-                    logger.warning(f"Bad request for team {client_id}: {response.text}")
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Неверные параметры запроса"
-                    )
-                elif response.status_code >= 500:
-                    logger.error(f"External API error: {response.status_code} - {response.text}")
-                    raise HTTPException(
-                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                        detail="Ошибка соединения с сервером авторизации"
-                    )
-
-                response.raise_for_status()
-                data = response.json()
-                logger.info(f"Authentication response keys: {list(data.keys())}")
-
-                # Check if response contains error details (some APIs return 200 with error in body)
-                if "detail" in data and data.get("access_token") is None:
-                    logger.warning(f"API returned error in body: {data.get('detail')}")
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Неверные данные авторизации"
-                    )
-
-                # Extract token and expiry
-                access_token = data.get("access_token")
-                expires_in = data.get("expires_in", 3600)
-
-                if not access_token:
-                    logger.error(f"No access_token in response: {data}")
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Неверные данные авторизации"
-                    )
-
-                # Cache the token with 5-minute safety margin
-                expires_at = current_time + expires_in - 300
-                _token_cache[client_id] = {
-                    "token": access_token,
-                    "expires_at": expires_at
-                }
-
-                logger.info(f"Successfully authenticated team {client_id}, token expires in {expires_in}s")
-                return access_token, expires_in
+            elif response.status_code == 400:
+                logger.warning(f"Bad request for team {client_id}: {response.text}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Неверные параметры запроса"
+                )
+            elif response.status_code >= 500:
+                logger.error(f"External API error: {response.status_code} - {response.text}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Ошибка соединения с сервером авторизации"
+                )
+
+            response.raise_for_status()
+            data = response.json()
+            logger.info(f"Authentication response keys: {list(data.keys())}")
+
+            # Check if response contains error details (some APIs return 200 with error in body)
+            if "detail" in data and data.get("access_token") is None:
+                logger.warning(f"API returned error in body: {data.get('detail')}")
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Неверные данные авторизации"
+                )
+
+            # Extract token and expiry
+            access_token = data.get("access_token")
+            expires_in = data.get("expires_in", 3600)
+
+            if not access_token:
+                logger.error(f"No access_token in response: {data}")
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Неверные данные авторизации"
+                )
+
+            # Cache the token with 5-minute safety margin
+            expires_at = current_time + expires_in - 300
+            _token_cache[client_id] = {
+                "token": access_token,
+                "expires_at": expires_at
+            }
+
+            logger.info(f"Successfully authenticated team {client_id}, token expires in {expires_in}s")
+            return access_token, expires_in
 
         except httpx.TimeoutException:
             logger.error(f"Timeout authenticating team {client_id}")
@@ -166,7 +184,44 @@ async def authenticate_team(client_id: str, client_secret: str) -> Tuple[str, in
 
 
 async def authenticate_with_bank(client_id: str, client_secret: str, bank_id: str = None) -> dict:
-    """Authenticate with bank API and return token.
+    """Authenticate with bank API and return token, reusing a cached token while it is valid.
+    
+    Tokens are cached per (client_id, bank_id, client_secret hash) until
+    BANK_TOKEN_REFRESH_MARGIN_SECONDS before expiry; concurrent refreshes for
+    the same key are collapsed into one bank call.
+    
+    Args:
+        client_id: Client ID for authentication
+        client_secret: Client secret for authentication
+        bank_id: Bank identifier (vbank, sbank, abank). If None, uses BASE_URL from env.
+    
+    Returns:
+        Bank API response with access_token and expiry info
+    """
+    secret_hash = hashlib.sha256((client_secret or "").encode()).hexdigest()
+    cache_key = (client_id, bank_id or "", secret_hash)
+    
+    cached = _bank_token_cache.get(cache_key)
+    if cached and time.time() < cached["expires_at"]:
+        return cached["data"]
+    
+    async with _get_lock(f"bank:{client_id}:{bank_id or ''}"):
+        # Another request may have refreshed the token while we waited
+        cached = _bank_token_cache.get(cache_key)
+        if cached and time.time() < cached["expires_at"]:
+            return cached["data"]
+        
+        data = await _request_bank_token(client_id, client_secret, bank_id)
+        expires_in = data.get("expires_in") or BANK_TOKEN_DEFAULT_TTL_SECONDS
+        _bank_token_cache[cache_key] = {
+            "data": data,
+            "expires_at": time.time() + float(expires_in) - BANK_TOKEN_REFRESH_MARGIN_SECONDS
+        }
+        return data
+
+
+async def _request_bank_token(client_id: str, client_secret: str, bank_id: str = None) -> dict:
+    """Request a new token from the bank API (/auth/bank-token).
     
     Args:
         client_id: Client ID for authentication
@@ -192,55 +247,55 @@ async def authenticate_with_bank(client_id: str, client_secret: str, bank_id: st
     logger.info(f"🔍 SERVICE DEBUG: client_secret length = {len(client_secret)}")
     
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{bank_url}/auth/bank-token"
-            params = {
-                "client_id": client_id,
-                "client_secret": client_secret
-            }
-            
-            logger.info(f"🔍 SERVICE DEBUG: Making POST to {url}")
-            logger.info(f"🔍 SERVICE DEBUG: Query params: client_id={client_id}, client_secret={'*' * 10}...")
-            
-            response = await client.post(url, params=params)
-            
-            logger.info(f"🔍 SERVICE DEBUG: Bank API response status: {response.status_code}")
-            logger.info(f"🔍 SERVICE DEBUG: Bank API response body: {response.text[:300]}")
-            
-            # Проверяем ошибки
-            if response.status_code == 401:
-                logger.warning(f"🔍 SERVICE DEBUG: Got 401 from bank API")
-                data = response.json()
-                logger.warning(f"🔍 SERVICE DEBUG: Error detail: {data.get('detail', 'unknown')}")
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Неверные данные авторизации"
-                )
-            
-            if response.status_code == 400:
-                logger.warning(f"🔍 SERVICE DEBUG: Got 400 from bank API")
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Неверные параметры запроса"
-                )
-            
-            response.raise_for_status()
+        client = get_http_client()
+        url = f"{bank_url}/auth/bank-token"
+        params = {
+            "client_id": client_id,
+            "client_secret": client_secret
+        }
+        
+        logger.info(f"🔍 SERVICE DEBUG: Making POST to {url}")
+        logger.info(f"🔍 SERVICE DEBUG: Query params: client_id={client_id}, client_secret={'*' * 10}...")
+        
+        response = await client.post(url, params=params, timeout=5)
+        
+        logger.info(f"🔍 SERVICE DEBUG: Bank API response status: {response.status_code}")
+        logger.info(f"🔍 SERVICE DEBUG: Bank API response body: {response.text[:300]}")
+        
+        # Проверяем ошибки
+        if response.status_code == 401:
+            logger.warning(f"🔍 SERVICE DEBUG: Got 401 from bank API")
             data = response.json()
-            
-            logger.info(f"🔍 SERVICE DEBUG: Successfully got response from bank API")
-            logger.info(f"🔍 SERVICE DEBUG: Response keys: {list(data.keys())}")
-            logger.info(f"🔍 SERVICE DEBUG: access_token in response: {'access_token' in data}")
-            
-            if not data.get("access_token"):
-                logger.error(f"🔍 SERVICE DEBUG: No access_token in response!")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Ошибка при получении токена"
-                )
-            
-            logger.info(f"🔍 SERVICE DEBUG: Returning token data successfully")
-            return data
-            
+            logger.warning(f"🔍 SERVICE DEBUG: Error detail: {data.get('detail', 'unknown')}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Неверные данные авторизации"
+            )
+        
+        if response.status_code == 400:
+            logger.warning(f"🔍 SERVICE DEBUG: Got 400 from bank API")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Неверные параметры запроса"
+            )
+        
+        response.raise_for_status()
+        data = response.json()
+        
+        logger.info(f"🔍 SERVICE DEBUG: Successfully got response from bank API")
+        logger.info(f"🔍 SERVICE DEBUG: Response keys: {list(data.keys())}")
+        logger.info(f"🔍 SERVICE DEBUG: access_token in response: {'access_token' in data}")
+        
+        if not data.get("access_token"):
+            logger.error(f"🔍 SERVICE DEBUG: No access_token in response!")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Ошибка при получении токена"
+            )
+        
+        logger.info(f"🔍 SERVICE DEBUG: Returning token data successfully")
+        return data
+        
     except httpx.HTTPStatusError as e:
         logger.error(f"🔍 SERVICE DEBUG: HTTP error from bank: {e.response.status_code}")
         logger.error(f"🔍 SERVICE DEBUG: Error body: {e.response.text}")
@@ -267,12 +322,13 @@ async def validate_token(access_token: str) -> bool:
         return False
 
     try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            response = await client.get(
-                f"{BASE_URL}/accounts",
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
-            return response.status_code != 401
+        client = get_http_client()
+        response = await client.get(
+            f"{BASE_URL}/accounts",
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=5
+        )
+        return response.status_code != 401
     except Exception as e:
         logger.warning(f"Token validation failed: {str(e)}")
         return False
@@ -309,9 +365,12 @@ def clear_token_cache(team_id: Optional[str] = None):
     """
     if team_id:
         _token_cache.pop(team_id, None)
+        for key in [key for key in _bank_token_cache if key[0] == team_id]:
+            _bank_token_cache.pop(key, None)
         logger.info(f"Cleared token cache for team {team_id}")
     else:
         _token_cache.clear()
+        _bank_token_cache.clear()
         logger.info("Cleared all token caches")
 
 
@@ -356,69 +415,61 @@ async def make_authenticated_request(
         )
 
     try:
-        # Determine base URL based on bank_id
-        BANK_URLS = {
-            "abank": "https://abank.open.bankingapi.ru",
-            "sbank": "https://sbank.open.bankingapi.ru",
-            "vbank": "https://vbank.open.bankingapi.ru"
-        }
+        # Determine base URL based on bank_id (default from env)
+        base_url = BANK_BASE_URLS.get(bank_id.lower(), BASE_URL) if bank_id else BASE_URL
         
-        if bank_id and bank_id.lower() in BANK_URLS:
-            base_url = BANK_URLS[bank_id.lower()]
-        else:
-            base_url = BASE_URL  # Default from env
+        client = get_http_client()
+        url = f"{base_url}{endpoint}"
         
-        async with httpx.AsyncClient(timeout=10) as client:
-            url = f"{base_url}{endpoint}"
-            
-            # Build headers per OpenBanking API specification
-            headers = {"Authorization": f"Bearer {access_token}"}
-            
-            # Add X-Requesting-Bank header if provided (recommended for consent/account requests)
-            if requesting_bank:
-                headers["X-Requesting-Bank"] = requesting_bank
-                logger.debug(f"Added X-Requesting-Bank: {requesting_bank}")
-            
-            # Add consent_id header if provided (required for account/transaction requests per Open Banking API)
-            if consent_id:
-                headers["consent_id"] = consent_id
-                logger.debug(f"Added consent_id: {consent_id}")
-            
-            # Add client_id to params if present in json_data (for account-access-consents endpoint)
-            if params is None:
-                params = {}
-            
-            logger.info(f"🔍 REQUEST DEBUG: {method} {url}")
-            logger.info(f"🔍 REQUEST DEBUG: Headers: {', '.join(headers.keys())}")
-
-            response = await client.request(
-                method,
-                url,
-                params=params,
-                json=json_data,
-                headers=headers
-            )
+        # Build headers per OpenBanking API specification
+        headers = {"Authorization": f"Bearer {access_token}"}
+        
+        # Add X-Requesting-Bank header if provided (recommended for consent/account requests)
+        if requesting_bank:
+            headers["X-Requesting-Bank"] = requesting_bank
+            logger.debug(f"Added X-Requesting-Bank: {requesting_bank}")
+        
+        # Add consent_id header if provided (required for account/transaction requests per Open Banking API)
+        if consent_id:
+            headers["consent_id"] = consent_id
+            logger.debug(f"Added consent_id: {consent_id}")
+        
+        # Add client_id to params if present in json_data (for account-access-consents endpoint)
+        if params is None:
+            params = {}
+        
+        logger.info(f"🔍 REQUEST DEBUG: {method} {url}")
+        logger.info(f"🔍 REQUEST DEBUG: Headers: {', '.join(headers.keys())}")
+
+        response = await client.request(
+            method,
+            url,
+            params=params,
+            json=json_data,
+            headers=headers,
+            timeout=10
+        )
 
-            logger.info(f"🔍 RESPONSE DEBUG: Status {response.status_code}")
+        logger.info(f"🔍 RESPONSE DEBUG: Status {response.status_code}")
 
-            # Handle authentication errors
-            if response.status_code == 401:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Токен авторизации истёк или неверный"
-                )
+        # Handle authentication errors
+        if response.status_code == 401:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Токен авторизации истёк или неверный"
+            )
 
-            # Handle not found errors
-            if response.status_code == 404:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Ресурс не найден"
-                )
+        # Handle not found errors
+        if response.status_code == 404:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Ресурс не найден"
+            )
 
-            # Handle other errors
-            response.raise_for_status()
+        # Handle other errors
+        response.raise_for_status()
 
-            return response.json()
+        return response.json()
 
     except httpx.HTTPStatusError as e:
         logger.error(f"API error: {e.response.status_code} {e.response.text}")
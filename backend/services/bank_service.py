@@ -15,36 +15,78 @@ API Documentation references:
 """
 
 import logging
+import os
 import uuid
 from typing import Dict, List, Optional
 from datetime import datetime
 
 import httpx
+import orjson
+from cachetools import TTLCache
 from fastapi import HTTPException, status
 from sqlmodel import Session, select
 
 from models.consent import Consent
+from services import cache
+from services.auth_service import BANK_BASE_URLS
+from services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
+# Banks known to apply transaction filters (from/to, min_amount/max_amount) server-side,
+# so their responses need no local post-filtering. Others get the params too, but
+# results are filtered locally in case the bank ignores them.
+_SUPPORTS_FILTERS: Dict[str, bool] = {
+    name.strip().lower(): True
+    for name in os.getenv("BANKS_WITH_TX_FILTERS", "").split(",")
+    if name.strip()
+}
+
+# Banks that rejected min_amount/max_amount (400/422) while the same request without
+# them succeeded. Amounts are not forwarded to them (and filtered locally) until the
+# entry expires, then forwarding is tried again.
+# Structure: {bank_name: True}
+AMOUNT_FILTERS_RETRY_SECONDS = 600
+_amount_filters_rejected: TTLCache = TTLCache(maxsize=16, ttl=AMOUNT_FILTERS_RETRY_SECONDS)
+
+
+# Only ABank approves consents automatically; SBank and VBank need manual approval
+_AUTO_APPROVE_BANKS = frozenset({"abank"})
+
+# Consent request fields that are the same for every client (Open Banking API spec)
+_CONSENT_REQUEST_BASE = {
+    "permissions": ("ReadAccountsDetail", "ReadBalances", "ReadTransactionsDetail"),
+    "reason": "Агрегация счетов для SYNTAX",
+    "requesting_bank_name": "SYNTAX App"
+}
+
+
+def amount_filters_forwarded(bank_name: str) -> bool:
+    """Whether min_amount/max_amount are sent to this bank (False while it is known to reject them)"""
+    return bank_name.lower() not in _amount_filters_rejected
+
+
+def _redacted(headers: Dict[str, str]) -> Dict[str, str]:
+    """Copy of request headers safe for logging (bearer token masked)"""
+    if "Authorization" not in headers:
+        return headers
+    return {**headers, "Authorization": "Bearer ***"}
+
 
 class BankService:
     """Service for interacting with bank APIs."""
     
     # Bank base URLs
-    BANK_URLS = {
-        "abank": "https://abank.open.bankingapi.ru",
-        "sbank": "https://sbank.open.bankingapi.ru",
-        "vbank": "https://vbank.open.bankingapi.ru"
-    }
+    BANK_URLS = BANK_BASE_URLS
     
-    def __init__(self, bank_name: str, db_session: Session):
+    def __init__(self, bank_name: str, db_session: Session, http_client: Optional[httpx.AsyncClient] = None):
         """
         Initialize bank service.
         
         Args:
             bank_name: Bank identifier (abank, sbank, vbank)
             db_session: Database session for consent management
+            http_client: Shared HTTP client (defaults to the process-wide pooled client)
         """
         self.bank_name = bank_name.lower()
         if self.bank_name not in self.BANK_URLS:
@@ -52,8 +94,24 @@ class BankService:
         
         self.base_url = self.BANK_URLS[self.bank_name]
         self.db_session = db_session
+        self.http = http_client or get_http_client()
         logger.info(f"Initialized BankService for {self.bank_name} at {self.base_url}")
     
+    @staticmethod
+    def account_headers(bank_token: str, requesting_bank: str, consent_id: Optional[str] = None) -> Dict[str, str]:
+        """
+        Build headers for account data requests (accounts, transactions, balances).
+        
+        X-Consent-Id is only added when a consent is given.
+        """
+        if consent_id is None:
+            return {"Authorization": f"Bearer {bank_token}", "X-Requesting-Bank": requesting_bank}
+        return {
+            "Authorization": f"Bearer {bank_token}",
+            "X-Requesting-Bank": requesting_bank,
+            "X-Consent-Id": consent_id
+        }
+    
     async def create_consent(
         self, 
         bank_token: str, 
@@ -86,9 +144,7 @@ class BankService:
         endpoint = "/account-consents/request"
         url = f"{self.base_url}{endpoint}"
         
-        # Determine if manual approval required (SBank and VBank)
-        # Only ABank has auto-approval
-        auto_approved = self.bank_name in ["abank"]
+        auto_approved = self.bank_name in _AUTO_APPROVE_BANKS
         
         headers = {
             "Authorization": f"Bearer {bank_token}",
@@ -98,15 +154,9 @@ class BankService:
         
         # Body structure per Open Banking API spec
         payload = {
+            **_CONSENT_REQUEST_BASE,
             "client_id": client_id,
-            "permissions": [
-                "ReadAccountsDetail",
-                "ReadBalances",
-                "ReadTransactionsDetail"
-            ],
-            "reason": "Агрегация счетов для SYNTAX",
             "requesting_bank": requesting_bank,
-            "requesting_bank_name": "SYNTAX App",
             "auto_approved": auto_approved
         }
         
@@ -116,81 +166,80 @@ class BankService:
         logger.info(f"Body: {payload}")
         
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                response = await client.post(url, headers=headers, json=payload)
-                
-                logger.info(f"Response status: {response.status_code}")
-                logger.info(f"Response body: {response.text[:500]}")
-                
-                if response.status_code == 401:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Токен авторизации истёк или неверный"
-                    )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                logger.info(f"Consent API response: {data}")
-                
-                # Extract consent_id and request_id from response
-                consent_id = data.get("consent_id") or data.get("id")
-                request_id = data.get("request_id")
-                consent_status = data.get("status", "approved" if auto_approved else "pending")
-                
-                # For SBank pending: use request_id as consent_id if consent_id is None
-                if not consent_id and request_id and consent_status == "pending":
-                    consent_id = request_id
-                    logger.info(f"Using request_id as consent_id for pending SBank: {consent_id}")
-                
-                # Check if consent already exists for this user and bank
-                existing_consent = self.db_session.exec(
-                    select(Consent).where(
-                        (Consent.client_id == client_id) &
-                        (Consent.bank_name == self.bank_name) &
-                        (Consent.status == "approved")
-                    )
-                ).first()
-                
-                if existing_consent:
-                    logger.info(f"Active consent already exists for {client_id} with {self.bank_name}, updating consent_id")
-                    # Update existing consent instead of creating new one
-                    existing_consent.consent_id = consent_id or existing_consent.consent_id
-                    existing_consent.request_id = request_id or existing_consent.request_id
-                    existing_consent.status = consent_status
-                    existing_consent.redirect_uri = data.get("redirect_uri")
-                    self.db_session.add(existing_consent)
-                    self.db_session.commit()
-                    self.db_session.refresh(existing_consent)
-                    consent = existing_consent
-                    logger.info(f"Updated existing consent in DB: {consent.id}, consent_id={consent_id}")
-                else:
-                    # Save new consent to database
-                    consent = Consent(
-                        bank_name=self.bank_name,
-                        client_id=client_id,
-                        consent_id=consent_id or f"pending-{request_id}",
-                        request_id=request_id,
-                        status=consent_status,
-                        redirect_uri=data.get("redirect_uri")
-                    )
-                    
-                    self.db_session.add(consent)
-                    self.db_session.commit()
-                    self.db_session.refresh(consent)
-                    logger.info(f"Saved new consent to DB: {consent.id}, consent_id={consent_id}, request_id={request_id}, status={consent_status}")
-                
-                logger.info(f"Saved consent to DB: {consent.id}, consent_id={consent_id}, request_id={request_id}, status={consent_status}")
-                
-                # Return normalized response - use consent_id for both auto-approved and pending
-                return {
-                    "consent_id": consent_id,
-                    "request_id": request_id,
-                    "status": consent_status,
-                    "redirect_url": data.get("redirect_uri"),
-                    "data": data
-                }
+            response = await self.http.post(url, headers=headers, json=payload, timeout=15)
+            
+            logger.info(f"Response status: {response.status_code}")
+            logger.info(f"Response body: {response.text[:500]}")
+            
+            if response.status_code == 401:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Токен авторизации истёк или неверный"
+                )
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            logger.info(f"Consent API response: {data}")
+            
+            # Extract consent_id and request_id from response
+            consent_id = data.get("consent_id") or data.get("id")
+            request_id = data.get("request_id")
+            consent_status = data.get("status", "approved" if auto_approved else "pending")
+            
+            # For SBank pending: use request_id as consent_id if consent_id is None
+            if not consent_id and request_id and consent_status == "pending":
+                consent_id = request_id
+                logger.info(f"Using request_id as consent_id for pending SBank: {consent_id}")
+            
+            # Check if consent already exists for this user and bank
+            existing_consent = self.db_session.exec(
+                select(Consent).where(
+                    (Consent.client_id == client_id) &
+                    (Consent.bank_name == self.bank_name) &
+                    (Consent.status == "approved")
+                )
+            ).first()
+            
+            if existing_consent:
+                logger.info(f"Active consent already exists for {client_id} with {self.bank_name}, updating consent_id")
+                # Update existing consent instead of creating new one
+                existing_consent.consent_id = consent_id or existing_consent.consent_id
+                existing_consent.request_id = request_id or existing_consent.request_id
+                existing_consent.status = consent_status
+                existing_consent.redirect_uri = data.get("redirect_uri")
+                self.db_session.add(existing_consent)
+                self.db_session.commit()
+                self.db_session.refresh(existing_consent)
+                consent = existing_consent
+                logger.info(f"Updated existing consent in DB: {consent.id}, consent_id={consent_id}")
+            else:
+                # Save new consent to database
+                consent = Consent(
+                    bank_name=self.bank_name,
+                    client_id=client_id,
+                    consent_id=consent_id or f"pending-{request_id}",
+                    request_id=request_id,
+                    status=consent_status,
+                    redirect_uri=data.get("redirect_uri")
+                )
                 
+                self.db_session.add(consent)
+                self.db_session.commit()
+                self.db_session.refresh(consent)
+                logger.info(f"Saved new consent to DB: {consent.id}, consent_id={consent_id}, request_id={request_id}, status={consent_status}")
+            
+            logger.info(f"Saved consent to DB: {consent.id}, consent_id={consent_id}, request_id={request_id}, status={consent_status}")
+            
+            # Return normalized response - use consent_id for both auto-approved and pending
+            return {
+                "consent_id": consent_id,
+                "request_id": request_id,
+                "status": consent_status,
+                "redirect_url": data.get("redirect_uri"),
+                "data": data
+            }
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Bank API error creating consent: {e.response.status_code} - {e.response.text}")
             raise HTTPException(
@@ -232,33 +281,32 @@ class BankService:
         logger.info(f"Checking consent status for {consent_id} at {self.bank_name}")
         
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(url, headers=headers)
-                
-                if response.status_code == 404:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Согласие не найдено"
-                    )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                # Update consent status in DB if changed
-                statement = select(Consent).where(
-                    Consent.consent_id == consent_id,
-                    Consent.bank_name == self.bank_name
+            response = await self.http.get(url, headers=headers, timeout=10)
+            
+            if response.status_code == 404:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Согласие не найдено"
                 )
-                consent = self.db_session.exec(statement).first()
-                
-                if consent and consent.status != data.get("status"):
-                    consent.status = data.get("status")
-                    consent.updated_at = datetime.utcnow()
-                    self.db_session.commit()
-                    logger.info(f"Updated consent {consent_id} status to {consent.status}")
-                
-                return data
-                
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            # Update consent status in DB if changed
+            statement = select(Consent).where(
+                Consent.consent_id == consent_id,
+                Consent.bank_name == self.bank_name
+            )
+            consent = self.db_session.exec(statement).first()
+            
+            if consent and consent.status != data.get("status"):
+                consent.status = data.get("status")
+                consent.updated_at = datetime.utcnow()
+                self.db_session.commit()
+                logger.info(f"Updated consent {consent_id} status to {consent.status}")
+            
+            return data
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Bank API error checking consent: {e.response.status_code} - {e.response.text}")
             raise HTTPException(
@@ -303,75 +351,72 @@ class BankService:
         logger.info(f"Headers: {headers}")
         
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(url, headers=headers)
-                
-                logger.info(f"Response status: {response.status_code}")
-                logger.info(f"Response body: {response.text[:500]}")
-                
-                if response.status_code == 404:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Запрос не найден"
-                    )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                # Extract consentId from response - handle nested structure
-                # SBank returns: {"data": {"consentId": "consent-...", "status": "Authorized", ...}, ...}
-                consent_data = data.get("data", data)
-                consent_id = consent_data.get("consentId") or consent_data.get("consent_id")
-                status_val = consent_data.get("status", "authorized").lower()
-                
-                # Normalize status values
-                if status_val in ["authorized", "Authorized"]:
-                    status_val = "authorized"
-                
-                logger.info(f"Got consent_id: {consent_id}, status: {status_val}")
-                logger.info(f"Full response: {data}")
-                
-                # Save/update consent in DB - try to find by request_id first
-                statement = select(Consent).where(
-                    Consent.request_id == request_id,
-                    Consent.bank_name == self.bank_name
+            response = await self.http.get(url, headers=headers, timeout=10)
+            
+            logger.info(f"Response status: {response.status_code}")
+            logger.info(f"Response body: {response.text[:500]}")
+            
+            if response.status_code == 404:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Запрос не найден"
                 )
-                db_consent = self.db_session.exec(statement).first()
-                
-                if db_consent:
-                    # Update existing consent with actual consent_id
-                    logger.info(f"Found existing consent with request_id {request_id}, updating consent_id to {consent_id}")
-                    db_consent.consent_id = consent_id
-                    db_consent.status = status_val
-                    db_consent.updated_at = datetime.utcnow()
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            # Extract consentId from response - handle nested structure
+            # SBank returns: {"data": {"consentId": "consent-...", "status": "Authorized", ...}, ...}
+            consent_data = data.get("data", data)
+            consent_id = consent_data.get("consentId") or consent_data.get("consent_id")
+            status_val = consent_data.get("status", "authorized").lower()
+            
+            # Normalize status values
+            if status_val in ["authorized", "Authorized"]:
+                status_val = "authorized"
+            
+            logger.info(f"Got consent_id: {consent_id}, status: {status_val}")
+            logger.info(f"Full response: {data}")
+            
+            # Save/update consent in DB - try to find by request_id first
+            statement = select(Consent).where(
+                Consent.request_id == request_id,
+                Consent.bank_name == self.bank_name
+            )
+            db_consent = self.db_session.exec(statement).first()
+            
+            if db_consent:
+                # Update existing consent with actual consent_id
+                logger.info(f"Found existing consent with request_id {request_id}, updating consent_id to {consent_id}")
+                db_consent.consent_id = consent_id
+                db_consent.status = status_val
+                db_consent.updated_at = datetime.utcnow()
+                self.db_session.add(db_consent)
+            else:
+                # Create new consent entry only if we have client_id
+                if client_id:
+                    logger.info(f"Creating new consent entry for {client_id}")
+                    db_consent = Consent(
+                        id=uuid.uuid4(),
+                        consent_id=consent_id,
+                        request_id=request_id,
+                        client_id=client_id,
+                        bank_name=self.bank_name,
+                        status=status_val
+                    )
                     self.db_session.add(db_consent)
                 else:
-                    # Create new consent entry only if we have client_id
-                    if client_id:
-                        logger.info(f"Creating new consent entry for {client_id}")
-                        db_consent = Consent(
-                            id=uuid.uuid4(),
-                            consent_id=consent_id,
-                            request_id=request_id,
-                            client_id=client_id,
-                            bank_name=self.bank_name,
-                            status=status_val,
-                            created_at=datetime.utcnow(),
-                            updated_at=datetime.utcnow()
-                        )
-                        self.db_session.add(db_consent)
-                    else:
-                        logger.warning(f"No existing consent found for request_id {request_id} and no client_id provided")
-                
-                self.db_session.commit()
-                logger.info(f"Saved/updated consent {consent_id} in DB with status {status_val}")
-                
-                return {
-                    "consent_id": consent_id,
-                    "status": status_val,
-                    "data": data
-                }
-                
+                    logger.warning(f"No existing consent found for request_id {request_id} and no client_id provided")
+            
+            self.db_session.commit()
+            logger.info(f"Saved/updated consent {consent_id} in DB with status {status_val}")
+            
+            return {
+                "consent_id": consent_id,
+                "status": status_val,
+                "data": data
+            }
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Bank API error getting consent: {e.response.status_code} - {e.response.text}")
             raise HTTPException(
@@ -408,59 +453,49 @@ class BankService:
         endpoint = "/accounts"
         url = f"{self.base_url}{endpoint}"
         
-        headers = {
-            "Authorization": f"Bearer {bank_token}",
-            "X-Requesting-Bank": requesting_bank
-        }
-        
-        # Only add X-Consent-Id header if it's not None
-        if consent_id is not None:
-            headers["X-Consent-Id"] = consent_id
+        headers = self.account_headers(bank_token, requesting_bank, consent_id)
         
         params = {
             "client_id": client_id or "team286"
         }
         
-        logger.info(f"Fetching accounts from {self.bank_name}")
-        logger.info(f"GET {url}")
-        logger.info(f"Headers: {headers}")
-        logger.info(f"Params: {params}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Fetching accounts from %s: GET %s headers=%s params=%s", self.bank_name, url, _redacted(headers), params)
         
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(url, headers=headers, params=params)
-                
-                if response.status_code == 401:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Токен авторизации истёк или неверный"
-                    )
-                
-                if response.status_code == 403:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Согласие не действительно или отозвано"
-                    )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                # Normalize response - different banks return different structures
-                # VBank: {accounts: {data: {account: [...]}, links: {...}}}
-                # ABank/SBank: {accounts: [...]} or just [...]
-                accounts = data.get("accounts", data) if isinstance(data, dict) else data
-                
-                # Handle VBank structure
-                if isinstance(accounts, dict) and "data" in accounts:
-                    accounts = accounts.get("data", {}).get("account", [])
-                
-                # Ensure we have a list
-                if not isinstance(accounts, list):
-                    accounts = [accounts] if accounts else []
-                
-                logger.info(f"Fetched {len(accounts)} accounts from {self.bank_name}")
-                return accounts
-                
+            response = await self.http.get(url, headers=headers, params=params, timeout=10)
+            
+            if response.status_code == 401:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Токен авторизации истёк или неверный"
+                )
+            
+            if response.status_code == 403:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Согласие не действительно или отозвано"
+                )
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            # Normalize response - different banks return different structures
+            # VBank: {accounts: {data: {account: [...]}, links: {...}}}
+            # ABank/SBank: {accounts: [...]} or just [...]
+            accounts = data.get("accounts", data) if isinstance(data, dict) else data
+            
+            # Handle VBank structure
+            if isinstance(accounts, dict) and "data" in accounts:
+                accounts = accounts.get("data", {}).get("account", [])
+            
+            # Ensure we have a list
+            if not isinstance(accounts, list):
+                accounts = [accounts] if accounts else []
+            
+            logger.info(f"Fetched {len(accounts)} accounts from {self.bank_name}")
+            return accounts
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Bank API error fetching accounts: {e.response.status_code} - {e.response.text}")
             raise HTTPException(
@@ -487,7 +522,9 @@ class BankService:
         to_date: Optional[str] = None,
         from_booking_date_time: Optional[str] = None,
         to_booking_date_time: Optional[str] = None,
-        offset: int = 0
+        offset: int = 0,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None
     ) -> Dict:
         """
         Get transaction history for account per Open Banking API.
@@ -509,9 +546,12 @@ class BankService:
             from_booking_date_time: Filter from booking date time (ISO format)
             to_booking_date_time: Filter to booking date time (ISO format)
             offset: Offset for pagination (default: 0)
+            min_amount: Filter by minimum amount (retried without it if the bank rejects the param)
+            max_amount: Filter by maximum amount (retried without it if the bank rejects the param)
         
         Returns:
-            Dict with transactions: {transactions: [...], pagination: {...}}
+            Dict with transactions: {transactions: [...], data: {...}, filters_applied: bool}.
+            filters_applied is True when the bank applied every filter itself.
         
         Raises:
             HTTPException: On API errors
@@ -524,11 +564,7 @@ class BankService:
         
         url = f"{self.base_url}{endpoint}"
         
-        headers = {
-            "Authorization": f"Bearer {bank_token}",
-            "X-Requesting-Bank": requesting_bank,
-            "X-Consent-Id": consent_id
-        }
+        headers = self.account_headers(bank_token, requesting_bank, consent_id)
         
         # Add accountId header if account_id is provided
         if account_id and account_id != "None":
@@ -550,66 +586,84 @@ class BankService:
         if to_booking_date_time:
             params["to_booking_date_time"] = to_booking_date_time
         
-        logger.info(f"Fetching transactions from {self.bank_name}")
-        logger.info(f"GET {url}")
-        logger.info(f"Headers: {headers}")
-        logger.info(f"Params: {params}")
+        # Push amount filters down so the bank returns only matching rows
+        amount_params = {}
+        if amount_filters_forwarded(self.bank_name):
+            if min_amount is not None:
+                amount_params["min_amount"] = min_amount
+            if max_amount is not None:
+                amount_params["max_amount"] = max_amount
+        filters_applied = _SUPPORTS_FILTERS.get(self.bank_name, False) and amount_filters_forwarded(self.bank_name)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Fetching transactions from %s: GET %s headers=%s params=%s", self.bank_name, url, _redacted(headers), params)
         
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                response = await client.get(url, headers=headers, params=params)
-                
-                if response.status_code == 401:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Токен авторизации истёк или неверный"
-                    )
-                
-                if response.status_code == 403:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Согласие не действительно или отозвано"
-                    )
-                
-                if response.status_code == 404:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Счёт не найден"
-                    )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                logger.info(f"Raw response from bank: {str(data)[:500]}")
-                
-                # Normalize response - VBank returns data.transaction
-                if isinstance(data, dict):
-                    if "data" in data and isinstance(data["data"], dict):
-                        # VBank format: {data: {transaction: [...]}}
-                        if "transaction" in data["data"]:
-                            transactions = data["data"]["transaction"] if isinstance(data["data"]["transaction"], list) else []
-                        else:
-                            transactions = []
-                    elif "transactions" in data:
-                        # Alternative format: {transactions: [...]}
-                        transactions = data["transactions"]
+            response = await self.http.get(url, headers=headers, params={**params, **amount_params}, timeout=15)
+            
+            if amount_params and response.status_code in (400, 422):
+                # Bank may not support amount filters - caller filters locally
+                logger.warning(f"{self.bank_name} rejected amount filters ({response.status_code}), retrying without them")
+                filters_applied = False
+                response = await self.http.get(url, headers=headers, params=params, timeout=15)
+                if response.is_success:
+                    # The amounts were the problem (not e.g. a bad date): skip the
+                    # rejected round trip for a while
+                    _amount_filters_rejected[self.bank_name] = True
+            
+            if response.status_code == 401:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Токен авторизации истёк или неверный"
+                )
+            
+            if response.status_code == 403:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Согласие не действительно или отозвано"
+                )
+            
+            if response.status_code == 404:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Счёт не найден"
+                )
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw response from bank: %s", str(data)[:500])
+            
+            # Normalize response - VBank returns data.transaction
+            if isinstance(data, dict):
+                if "data" in data and isinstance(data["data"], dict):
+                    # VBank format: {data: {transaction: [...]}}
+                    if "transaction" in data["data"]:
+                        transactions = data["data"]["transaction"] if isinstance(data["data"]["transaction"], list) else []
                     else:
                         transactions = []
-                elif isinstance(data, list):
-                    # Direct list format
-                    transactions = data
-                    data = {"transactions": transactions}
+                elif "transactions" in data:
+                    # Alternative format: {transactions: [...]}
+                    transactions = data["transactions"]
                 else:
                     transactions = []
-                
-                logger.info(f"Fetched {len(transactions)} transactions for account {account_id}")
-                
-                # Return normalized format
-                return {
-                    "transactions": transactions,
-                    "data": data
-                }
-                
+            elif isinstance(data, list):
+                # Direct list format
+                transactions = data
+                data = {"transactions": transactions}
+            else:
+                transactions = []
+            
+            logger.info(f"Fetched {len(transactions)} transactions for account {account_id}")
+            
+            # Return normalized format
+            return {
+                "transactions": transactions,
+                "data": data,
+                "filters_applied": filters_applied
+            }
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Bank API error fetching transactions: {e.response.status_code} - {e.response.text}")
             raise HTTPException(
@@ -651,38 +705,39 @@ class BankService:
         logger.info(f"Revoking consent {consent_id} at {self.bank_name}")
         
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.delete(url, headers=headers)
-                
-                if response.status_code == 404:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Согласие не найдено"
-                    )
-                
-                response.raise_for_status()
-                
-                # Update consent status in DB
-                statement = select(Consent).where(
-                    Consent.consent_id == consent_id,
-                    Consent.bank_name == self.bank_name
+            response = await self.http.delete(url, headers=headers, timeout=10)
+            
+            if response.status_code == 404:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Согласие не найдено"
                 )
-                consent = self.db_session.exec(statement).first()
-                
-                if consent:
-                    consent.status = "revoked"
-                    consent.updated_at = datetime.utcnow()
-                    self.db_session.commit()
-                    logger.info(f"Marked consent {consent_id} as revoked in DB")
-                
-                # Parse response if JSON, otherwise return success message
-                try:
-                    data = response.json()
-                except:
-                    data = {"status": "revoked", "message": "Согласие успешно отозвано"}
-                
-                return data
-                
+            
+            response.raise_for_status()
+            
+            # Update consent status in DB
+            statement = select(Consent).where(
+                Consent.consent_id == consent_id,
+                Consent.bank_name == self.bank_name
+            )
+            consent = self.db_session.exec(statement).first()
+            
+            if consent:
+                consent.status = "revoked"
+                consent.updated_at = datetime.utcnow()
+                self.db_session.commit()
+                logger.info(f"Marked consent {consent_id} as revoked in DB")
+                # Transactions read under this consent must not be served any more
+                await cache.invalidate_transactions(self.bank_name, consent.client_id)
+            
+            # Parse response if JSON, otherwise return success message
+            try:
+                data = orjson.loads(response.content)
+            except:
+                data = {"status": "revoked", "message": "Согласие успешно отозвано"}
+            
+            return data
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Bank API error revoking consent: {e.response.status_code} - {e.response.text}")
             raise HTTPException(
@@ -787,48 +842,47 @@ class BankService:
         logger.info(f"Payload: {payload}")
         
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                response = await client.post(url, headers=headers, json=payload)
-                
-                logger.info(f"Payment consent response status: {response.status_code}")
-                logger.info(f"Payment consent response body: {response.text}")
-                
-                if response.status_code == 401:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Токен авторизации истёк или неверный"
-                    )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                logger.info(f"Payment consent API response: {data}")
-                
-                # Extract consent_id from response - handle different formats
-                consent_id = data.get("consent_id") or data.get("ConsentId") or data.get("id")
-                request_id = data.get("request_id")
-                status_from_response = data.get("status", "Authorised")
-                redirect_url = data.get("redirect_url")
-                
-                # If no redirect_url provided by bank, construct it (for VBank/SBank manual approval)
-                if not redirect_url and request_id and status_from_response and status_from_response.lower() == "pending":
-                    # Construct redirect URL based on bank - use consents.html endpoint (same for both account and payment consents)
-                    redirect_url = f"https://{self.bank_name}.open.bankingapi.ru/client/consents.html?request_id={request_id}"
-                    logger.info(f"Constructed redirect URL for payment consent: {redirect_url}")
-                
-                logger.info(f"✅ Payment consent received - consent_id: {consent_id}, request_id: {request_id}, status: {status_from_response}, redirect_url: {redirect_url}")
-                
-                # Return response with redirect_url if available (for manual approval banks like VBank)
-                return {
-                    "consent_id": consent_id,
-                    "request_id": request_id,
-                    "status": status_from_response,
-                    "redirect_url": redirect_url,
-                    "amount": amount,
-                    "currency": "RUB",
-                    "data": data
-                }
-                
+            response = await self.http.post(url, headers=headers, json=payload, timeout=15)
+            
+            logger.info(f"Payment consent response status: {response.status_code}")
+            logger.info(f"Payment consent response body: {response.text}")
+            
+            if response.status_code == 401:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Токен авторизации истёк или неверный"
+                )
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            logger.info(f"Payment consent API response: {data}")
+            
+            # Extract consent_id from response - handle different formats
+            consent_id = data.get("consent_id") or data.get("ConsentId") or data.get("id")
+            request_id = data.get("request_id")
+            status_from_response = data.get("status", "Authorised")
+            redirect_url = data.get("redirect_url")
+            
+            # If no redirect_url provided by bank, construct it (for VBank/SBank manual approval)
+            if not redirect_url and request_id and status_from_response and status_from_response.lower() == "pending":
+                # Construct redirect URL based on bank - use consents.html endpoint (same for both account and payment consents)
+                redirect_url = f"https://{self.bank_name}.open.bankingapi.ru/client/consents.html?request_id={request_id}"
+                logger.info(f"Constructed redirect URL for payment consent: {redirect_url}")
+            
+            logger.info(f"✅ Payment consent received - consent_id: {consent_id}, request_id: {request_id}, status: {status_from_response}, redirect_url: {redirect_url}")
+            
+            # Return response with redirect_url if available (for manual approval banks like VBank)
+            return {
+                "consent_id": consent_id,
+                "request_id": request_id,
+                "status": status_from_response,
+                "redirect_url": redirect_url,
+                "amount": amount,
+                "currency": "RUB",
+                "data": data
+            }
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Bank API error creating payment consent: {e.response.status_code} - {e.response.text}")
             raise HTTPException(
@@ -878,39 +932,38 @@ class BankService:
         logger.info(f"GET {url}")
         
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(url, headers=headers)
-                
-                if response.status_code == 401:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Токен авторизации истёк или неверный"
-                    )
-                
-                if response.status_code == 404:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Согласие на платёж не найдено"
-                    )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                logger.info(f"Payment consent details: {data}")
-                
-                # Extract consent_id and status
-                consent_id = data.get("consent_id") or data.get("ConsentId")
-                status_from_response = data.get("status", "pending")
-                
-                logger.info(f"✅ Got payment consent_id: {consent_id}, status: {status_from_response}")
-                
-                return {
-                    "consent_id": consent_id,
-                    "request_id": request_id,
-                    "status": status_from_response,
-                    "data": data
-                }
-                
+            response = await self.http.get(url, headers=headers, timeout=10)
+            
+            if response.status_code == 401:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Токен авторизации истёк или неверный"
+                )
+            
+            if response.status_code == 404:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Согласие на платёж не найдено"
+                )
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            logger.info(f"Payment consent details: {data}")
+            
+            # Extract consent_id and status
+            consent_id = data.get("consent_id") or data.get("ConsentId")
+            status_from_response = data.get("status", "pending")
+            
+            logger.info(f"✅ Got payment consent_id: {consent_id}, status: {status_from_response}")
+            
+            return {
+                "consent_id": consent_id,
+                "request_id": request_id,
+                "status": status_from_response,
+                "data": data
+            }
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Bank API error getting payment consent: {e.response.status_code} - {e.response.text}")
             raise HTTPException(
@@ -1005,41 +1058,43 @@ class BankService:
         logger.info(f"Payload: {payload}")
         
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                response = await client.post(url, headers=headers, params=params, json=payload)
-                
-                logger.info(f"Payment response status: {response.status_code}")
-                logger.info(f"Payment response body: {response.text}")
-                
-                if response.status_code == 401:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Токен авторизации истёк или неверный"
-                    )
-                
-                if response.status_code == 403:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Согласие на платёж не действительно или истекло"
-                    )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                logger.info(f"Payment API response: {data}")
-                
-                # Extract payment details from response - handle different formats
-                payment_id = data.get("payment_id") or data.get("PaymentId") or data.get("id")
-                payment_status = data.get("status", "AcceptedSettlementCompleted")
-                
-                return {
-                    "payment_id": payment_id,
-                    "status": payment_status,
-                    "amount": amount,
-                    "currency": "RUB",
-                    "data": data
-                }
-                
+            response = await self.http.post(url, headers=headers, params=params, json=payload, timeout=15)
+            
+            logger.info(f"Payment response status: {response.status_code}")
+            logger.info(f"Payment response body: {response.text}")
+            
+            if response.status_code == 401:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Токен авторизации истёк или неверный"
+                )
+            
+            if response.status_code == 403:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Согласие на платёж не действительно или истекло"
+                )
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            logger.info(f"Payment API response: {data}")
+            
+            # Extract payment details from response - handle different formats
+            payment_id = data.get("payment_id") or data.get("PaymentId") or data.get("id")
+            payment_status = data.get("status", "AcceptedSettlementCompleted")
+            
+            # The debtor account changed - drop cached transactions for this client
+            await cache.invalidate_transactions(self.bank_name, client_id)
+            
+            return {
+                "payment_id": payment_id,
+                "status": payment_status,
+                "amount": amount,
+                "currency": "RUB",
+                "data": data
+            }
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Bank API error submitting payment: {e.response.status_code} - {e.response.text}")
             raise HTTPException(
@@ -1081,21 +1136,20 @@ class BankService:
         logger.info(f"Checking payment status for {payment_id} at {self.bank_name}")
         
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(url, headers=headers)
-                
-                if response.status_code == 404:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Платёж не найден"
-                    )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                logger.info(f"Payment status: {data}")
-                return data
-                
+            response = await self.http.get(url, headers=headers, timeout=10)
+            
+            if response.status_code == 404:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Платёж не найден"
+                )
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            logger.info(f"Payment status: {data}")
+            return data
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Bank API error checking payment: {e.response.status_code} - {e.response.text}")
             raise HTTPException(
@@ -0,0 +1,293 @@
+"""
+Shared cache for bank API responses.
+
+When REDIS_URL is set, entries are stored in Redis (SETEX with TTL) so that
+every uvicorn worker shares the same cache and memory is bounded by Redis.
+Values are MessagePack-encoded (zstd-compressed above COMPRESS_MIN_BYTES), and
+a tiny per-worker L1 cache with a few seconds of TTL sits in front of Redis to
+save a round trip on hot keys.
+Without REDIS_URL a size-bounded in-process cache is used, which is enough
+for local development with a single worker.
+
+Entries written with an index are also added to a Redis SET listing the keys
+of that client, so invalidation deletes exactly those keys (no SCAN over the
+keyspace) and publishes the key prefix on the INVALIDATION_CHANNEL, so every
+worker drops matching L1 entries as well.
+
+Redis errors never fail a request: reads are treated as a cache miss and
+writes are skipped.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, MutableMapping, Optional
+
+import msgpack
+import redis.asyncio as redis
+import zstandard
+from cachetools import TLRUCache, TTLCache
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+# Connections per worker; when all are busy, callers wait up to REDIS_POOL_TIMEOUT_SECONDS
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "20"))
+REDIS_POOL_TIMEOUT_SECONDS = 2
+
+INVALIDATION_CHANNEL = "tx:invalidate"
+
+_redis: Optional[redis.Redis] = None
+_listener_task: Optional[asyncio.Task] = None
+
+# Max entries in each per-worker cache; keys include filters, so size for clients x filter combinations
+LOCAL_CACHE_MAXSIZE = int(os.getenv("LOCAL_CACHE_MAXSIZE", "1024"))
+L1_CACHE_TTL_SECONDS = 5
+
+# Transaction payloads repeat the same field names per row and shrink several times;
+# smaller values are stored as plain MessagePack, where compression would not pay off
+COMPRESS_MIN_BYTES = 1024
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+# Local fallback: {key: (ttl, value)}. Expired entries are evicted on access and
+# least-recently-used entries are evicted once LOCAL_CACHE_MAXSIZE is reached.
+_local_cache: TLRUCache = TLRUCache(
+    maxsize=LOCAL_CACHE_MAXSIZE,
+    ttu=lambda _key, entry, now: now + entry[0]
+)
+
+# L1 in front of Redis: {key: value}, kept short so workers never drift far apart
+_l1_cache: TTLCache = TTLCache(maxsize=LOCAL_CACHE_MAXSIZE, ttl=L1_CACHE_TTL_SECONDS)
+
+# Extra per-worker caches (e.g. filtered results) cleared together with invalidations
+_registered_caches: List[MutableMapping] = []
+
+
+def tx_key_prefix(bank_name: str, client_id: str) -> str:
+    """Key prefix shared by every cached transactions entry of a client at a bank."""
+    return f"tx:{bank_name.lower()}:{client_id}:"
+
+
+def tx_index_key(bank_name: str, client_id: str) -> str:
+    """Redis SET listing the cached transactions keys of a client at a bank."""
+    return f"idx:tx:{bank_name.lower()}:{client_id}"
+
+
+def register_local_cache(store: MutableMapping) -> None:
+    """
+    Register an in-process cache whose keys use the same prefixes as this cache.
+
+    Its entries are dropped by invalidate_prefix() and by pub/sub invalidations.
+    """
+    _registered_caches.append(store)
+
+
+def _encode(value: Any) -> bytes:
+    packed = msgpack.packb(value)
+    if len(packed) < COMPRESS_MIN_BYTES:
+        return packed
+    return _compressor.compress(packed)
+
+
+def _decode(raw: bytes) -> Any:
+    # MessagePack never starts with the zstd frame magic, so both forms can coexist
+    if raw.startswith(_ZSTD_MAGIC):
+        raw = _decompressor.decompress(raw)
+    return msgpack.unpackb(raw)
+
+
+def single_flight(inflight: Dict, key, fetch: Callable[[], Awaitable]) -> asyncio.Task:
+    """
+    Get the in-flight fetch task for a key, starting one if there is none.
+    
+    Callers should await it through asyncio.shield() so a disconnecting client
+    does not cancel the fetch for everyone else waiting on it.
+    """
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        inflight[key] = task
+        
+        def _forget(done: asyncio.Task) -> None:
+            inflight.pop(key, None)
+            if not done.cancelled():
+                done.exception()  # Mark as retrieved even if every waiter went away
+        
+        task.add_done_callback(_forget)
+    return task
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """
+    Get the shared Redis client, creating it on first use.
+
+    Returns:
+        Optional[redis.Redis]: Client if REDIS_URL is configured, None otherwise
+    """
+    global _redis
+    if _redis is None and REDIS_URL:
+        pool = redis.BlockingConnectionPool.from_url(
+            REDIS_URL,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT_SECONDS
+        )
+        _redis = redis.Redis.from_pool(pool)
+        logger.info("Redis cache client initialized")
+    return _redis
+
+
+async def get_value(key: str) -> Optional[Any]:
+    """
+    Read a value from the cache.
+
+    Args:
+        key: Cache key
+
+    Returns:
+        Decoded value, or None on miss/expiry/backend error
+    """
+    client = get_redis()
+    if client is None:
+        entry = _local_cache.get(key)
+        return entry[1] if entry is not None else None
+
+    value = _l1_cache.get(key)
+    if value is not None:
+        return value
+
+    try:
+        raw = await client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {str(e)}")
+        return None
+    if raw is None:
+        return None
+
+    value = _decode(raw)
+    _l1_cache[key] = value
+    return value
+
+
+async def set_value(key: str, value: Any, ttl: int, index: Optional[str] = None) -> None:
+    """
+    Store a MessagePack-serializable value in the cache.
+
+    Args:
+        key: Cache key
+        value: Value to store
+        ttl: Time to live in seconds
+        index: Optional index SET to record the key in (see invalidate_prefix)
+    """
+    client = get_redis()
+    if client is None:
+        _local_cache[key] = (ttl, value)
+        return
+
+    _l1_cache[key] = value
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.set(key, _encode(value), ex=ttl)
+            if index is not None:
+                pipe.sadd(index, key)
+                # The index lives as long as its longest-lived key
+                pipe.expire(index, ttl, nx=True)
+                pipe.expire(index, ttl, gt=True)
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {str(e)}")
+
+
+def _drop_local(prefix: str) -> int:
+    """Remove in-process entries whose key starts with prefix."""
+    dropped = 0
+    for store in (_local_cache, _l1_cache, *_registered_caches):
+        for key in [k for k in list(store.keys()) if k.startswith(prefix)]:
+            store.pop(key, None)
+            dropped += 1
+    return dropped
+
+
+async def invalidate_prefix(prefix: str, index: Optional[str] = None) -> None:
+    """
+    Delete every cached entry whose key starts with prefix, in all workers.
+
+    Args:
+        prefix: Key prefix, e.g. "tx:vbank:team286-1:"
+        index: Index SET the keys were written with; avoids a SCAN when given
+    """
+    _drop_local(prefix)
+
+    client = get_redis()
+    if client is None:
+        return
+
+    try:
+        if index is not None:
+            keys = [*await client.smembers(index), index]
+        else:
+            keys = [key async for key in client.scan_iter(match=f"{prefix}*", count=500)]
+        if keys:
+            await client.delete(*keys)
+        await client.publish(INVALIDATION_CHANNEL, prefix)
+    except redis.RedisError as e:
+        logger.warning(f"Cache invalidation failed for {prefix}: {str(e)}")
+
+
+async def invalidate_transactions(bank_name: str, client_id: str) -> None:
+    """
+    Invalidate all cached transactions of a client at a bank.
+
+    Called after this service commits a write (e.g. a payment or a consent
+    revocation) on the bank side.
+    """
+    logger.info(f"🧹 Invalidating transactions cache for {client_id} at {bank_name}")
+    await invalidate_prefix(tx_key_prefix(bank_name, client_id), index=tx_index_key(bank_name, client_id))
+
+
+async def _listen_for_invalidations() -> None:
+    """Drop L1 entries when another worker publishes an invalidation."""
+    while True:
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    prefix = message["data"]
+                    if isinstance(prefix, bytes):
+                        prefix = prefix.decode()
+                    _drop_local(prefix)
+        except asyncio.CancelledError:
+            raise
+        except redis.RedisError as e:
+            logger.warning(f"Cache invalidation listener error: {str(e)}, reconnecting")
+            await asyncio.sleep(1)
+
+
+def start_invalidation_listener() -> None:
+    """Create the Redis client and start the pub/sub invalidation listener (called on application startup)."""
+    global _listener_task
+    if get_redis() is not None and _listener_task is None:
+        _listener_task = asyncio.create_task(_listen_for_invalidations())
+        logger.info("Cache invalidation listener started")
+
+
+async def close_cache() -> None:
+    """Stop the invalidation listener and close the Redis connection pool (called on application shutdown)."""
+    global _redis, _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+        logger.info("Redis cache client closed")
@@ -0,0 +1,57 @@
+"""
+Shared HTTP client for outbound bank API calls.
+
+A single httpx.AsyncClient is reused by all requests so that keep-alive
+connections to the bank APIs are pooled instead of paying a new TCP + TLS
+handshake on every call. HTTP/2 is negotiated via ALPN where the bank
+supports it, falling back to HTTP/1.1 otherwise. The client is created lazily and closed on
+application shutdown (see lifespan in main.py).
+"""
+
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Default timeout for bank calls; individual requests may override it
+HTTP_TIMEOUT_SECONDS = 30
+# Pool sized for concurrent bank fan-out (all-banks accounts, balance prefetch)
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=30)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared AsyncClient, creating it on first use.
+
+    Can be used directly or as a FastAPI dependency:
+        ```python
+        @router.get("/items")
+        async def list_items(http: httpx.AsyncClient = Depends(get_http_client)):
+            response = await http.get(url)
+        ```
+
+    Returns:
+        httpx.AsyncClient: Process-wide client with a keep-alive connection pool
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            http2=True,  # Multiplex concurrent requests to the same bank over one connection
+            limits=HTTP_POOL_LIMITS
+        )
+        logger.info("Shared HTTP client initialized")
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared AsyncClient and release pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Shared HTTP client closed")
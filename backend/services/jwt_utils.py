@@ -6,16 +6,23 @@ Wraps bank access tokens with additional metadata and expiry.
 
 import jwt
 import os
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 import logging
 
+from cachetools import TTLCache
+
 logger = logging.getLogger(__name__)
 
 JWT_SECRET = os.getenv("JWT_SECRET", "your-super-secret-jwt-key-change-in-production")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRY_MINUTES = 30  # Short-lived session tokens
 
+# Verified payloads by raw token, so repeat requests skip signature verification.
+# Entries live at most one token lifetime; "exp" is re-checked on every hit.
+_decoded_cache: TTLCache = TTLCache(maxsize=4096, ttl=JWT_EXPIRY_MINUTES * 60)
+
 
 def encode_token(
     access_token: str,
@@ -94,17 +101,32 @@ def decode_token(token: str) -> Optional[Dict]:
 
     Raises:
         jwt.ExpiredSignatureError: Token has expired
-        jwt.InvalidTokenError: Token is invalid
+        jwt.InvalidTokenError: Token is invalid or lacks the exp/client_id claims
     """
+    cached = _decoded_cache.get(token)
+    if cached is not None:
+        if cached.get("exp", 0) > time.time():
+            return dict(cached)
+        # Expired since it was cached - fall through so jwt raises ExpiredSignatureError
+        _decoded_cache.pop(token, None)
+    
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        # One verified decode; every caller reads claims from this payload.
+        # "exp" is required because cached payloads are expired by it.
+        payload = jwt.decode(
+            token,
+            JWT_SECRET,
+            algorithms=[JWT_ALGORITHM],
+            options={"require": ["exp", "client_id"]}
+        )
         logger.info(f"Successfully decoded JWT token for client {payload.get('client_id')}")
         
         # Add bank_token alias for compatibility with new BankService
         if "access_token" in payload and "bank_token" not in payload:
             payload["bank_token"] = payload["access_token"]
         
-        return payload
+        _decoded_cache[token] = payload
+        return dict(payload)
     except jwt.ExpiredSignatureError:
         logger.warning("JWT token has expired")
         raise